@@ -0,0 +1,297 @@
+"""
+Offline end-to-end benchmark for the CLI ask path and both Flask apps.
+
+Everything runs locally: a fixture server stands in for DuckDuckGo and the result sites,
+stub (or tiny) models replace SentenceTransformer and BART, and results.db is pre-filled
+with N synthetic rows in a throw-away data directory. Per-stage latency percentiles and
+throughput are printed and written to JSON so runs can be compared.
+
+    python benchmarks/bench_e2e.py --out run.json
+    python benchmarks/bench_e2e.py --db-rows 200000 --concurrency 8 --compare run.json
+"""
+import argparse
+import functools
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+AGENT_DIR = os.path.join(HERE, '..', 'ripplica_agent')
+
+TARGETS = ('cli', 'web_ui', 'web_ui_stream')
+TINY_EMBEDDING_MODEL = 'sentence-transformers/paraphrase-MiniLM-L3-v2'
+TINY_SUMMARIZATION_MODEL = 'sshleifer/distilbart-cnn-6-6'
+
+# Pipeline functions timed in each consumer module, and the stage name they report as
+STAGES = {
+    'is_valid_query': 'validate',
+    'get_embedding': 'embed',
+    'get_similar_items': 'lookup',
+    'search_and_scrape': 'search_and_scrape',
+    'summarize_results': 'summarize',
+    'save_result': 'save',
+}
+
+
+class Recorder:
+    """Thread-safe collection of latency samples (seconds) per stage name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.samples.setdefault(name, []).append(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.samples = {}
+
+    def timed(self, name, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(name, time.perf_counter() - start)
+        return wrapper
+
+
+def summarize_samples(samples):
+    ms = np.asarray(samples) * 1000
+    return {'count': int(len(ms)), 'mean_ms': float(ms.mean()), 'p50_ms': float(np.percentile(ms, 50)),
+            'p90_ms': float(np.percentile(ms, 90)), 'p99_ms': float(np.percentile(ms, 99)), 'max_ms': float(ms.max())}
+
+
+def make_queries(target, count, unique_ratio, seed):
+    # Distinct random pseudo-words per query keep every query (and every target) a cache miss
+    # until it is repeated
+    unique = max(1, int(count * unique_ratio))
+    rng = random.Random(f'{target}-{seed}')
+    syllables = ['ka', 'lo', 'mi', 'ne', 'ru', 'ta', 'vi', 'zo', 'pe', 'su', 'go', 'da']
+    def word():
+        return ''.join(rng.choice(syllables) for _ in range(3))
+    base = [f"what is {word()} {word()} {word()}" for _ in range(unique)]
+    queries = base + [rng.choice(base) for _ in range(count - unique)]
+    rng.shuffle(queries)
+    return queries
+
+
+def build_history(storage, rows, dim, seed=0):
+    """Bulk-inserts synthetic queries, unit embeddings and per-result items into results.db."""
+    import sqlite3
+    rng = np.random.default_rng(seed)
+    conn = sqlite3.connect(storage.DB_PATH)
+    for start in range(0, rows, 10000):
+        n = min(10000, rows - start)
+        vectors = rng.normal(size=(n, dim)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        cur = conn.cursor()
+        for i, vec in enumerate(vectors):
+            q = f'synthetic history query {start + i}'
+            cur.execute('INSERT INTO results (query, embedding, summary) VALUES (?, ?, ?)',
+                        (q, vec.tobytes(), f'- [{q}](https://example.com/{start + i})\n  cached summary\n'))
+            cur.execute('INSERT INTO result_items (result_id, rank, url, title, summary) VALUES (?, 0, ?, ?, ?)',
+                        (cur.lastrowid, f'https://example.com/{start + i}', q, 'cached summary'))
+        conn.commit()
+    conn.close()
+
+
+def run_cli(queries, concurrency, modules):
+    main = modules['main']
+    def one(query):
+        start = time.perf_counter()
+        main.run_query(query, echo=lambda *args, **kwargs: None)
+        return {'total': time.perf_counter() - start}
+    return _drive(queries, concurrency, one)
+
+
+def run_flask(app, queries, concurrency, streaming):
+    import requests
+    import logging
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f'http://127.0.0.1:{server.server_port}'
+    session = requests.Session()
+
+    def one(query):
+        start = time.perf_counter()
+        sample = {}
+        if streaming:
+            with session.get(f'{base}/stream', params={'query': query}, stream=True, timeout=300) as resp:
+                for line in resp.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith('data: '):
+                        continue
+                    event = json.loads(line[6:])
+                    if event['type'] == 'summary' and 'first_summary' not in sample:
+                        sample['first_summary'] = time.perf_counter() - start
+                    if event['type'] in ('done', 'error'):
+                        break
+        else:
+            session.post(f'{base}/', data={'query': query}, timeout=300).raise_for_status()
+        sample['total'] = time.perf_counter() - start
+        return sample
+
+    try:
+        return _drive(queries, concurrency, one)
+    finally:
+        server.shutdown()
+        session.close()
+
+
+def _drive(queries, concurrency, one):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one, queries))
+    wall = time.perf_counter() - start
+    result = {'wall_s': wall, 'throughput_qps': len(queries) / wall}
+    for key in ('total', 'first_summary'):
+        values = [s[key] for s in samples if key in s]
+        if values:
+            result[key] = summarize_samples(values)
+    return result
+
+
+def setup(args):
+    """Points the agent at a fresh data dir, the fixture server and the chosen models."""
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix='ripplica-bench-')
+    os.environ['RIPPLICA_DATA_DIR'] = data_dir
+    sys.path.insert(0, AGENT_DIR)
+    sys.path.insert(0, HERE)
+    from fixture_server import FixtureServer, RESULTS_PER_PAGE
+    import stubs
+    import storage, embeddings, summarizer, search_scraper
+    import inference
+    # Measure the models configured here, not a shared inference server the shell points at
+    inference.INFERENCE_SOCKET = None
+
+    server = FixtureServer(page_latency_ms=args.page_latency_ms, search_latency_ms=args.search_latency_ms).start()
+    search_scraper.SEARCH_URL = server.search_url
+    # Every fixture page lives on one host; let a whole batch through the per-host limit
+    search_scraper.PER_HOST_LIMIT = max(search_scraper.PER_HOST_LIMIT, RESULTS_PER_PAGE)
+
+    if args.models == 'stub':
+        embeddings._model = stubs.StubEncoder()
+        summarizer._summarizer = stubs.StubSummarizer(ms_per_token=args.ms_per_token)
+    elif args.models == 'tiny':
+        embeddings.MODEL_NAME = TINY_EMBEDDING_MODEL
+        summarizer.MODEL_NAME = TINY_SUMMARIZATION_MODEL
+    if args.browser == 'stub':
+        pool = stubs.HttpBrowserPool()
+        search_scraper.get_browser_pool = lambda: pool
+
+    dim = embeddings.get_embedding('warm up').shape[0]
+    start = time.perf_counter()
+    build_history(storage, args.db_rows, dim)
+    build_s = time.perf_counter() - start
+    start = time.perf_counter()
+    storage.get_index()
+    index_s = time.perf_counter() - start
+
+    import main, pipeline, web_ui, web_ui_stream
+    recorder = Recorder()
+    # main and web_ui run their cache misses through pipeline.answer_query
+    for module in (main, pipeline, web_ui, web_ui_stream):
+        for fn_name, stage in STAGES.items():
+            # The streaming app consumes iter_search_and_scrape instead; run_flask measures
+            # its first-summary latency
+            if hasattr(module, fn_name):
+                setattr(module, fn_name, recorder.timed(stage, getattr(module, fn_name)))
+    search_scraper.scrape_urls = recorder.timed('scrape', search_scraper.scrape_urls)
+    modules = {'main': main, 'web_ui': web_ui, 'web_ui_stream': web_ui_stream, 'search_scraper': search_scraper}
+    setup_info = {'data_dir': data_dir, 'history_build_s': build_s, 'index_load_s': index_s, 'embedding_dim': dim}
+    return server, recorder, modules, setup_info
+
+
+def compare(current, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nComparison with {baseline_path}")
+    print(f"{'target':<15}{'stage':<20}{'p50 ms':>26}{'p99 ms':>26}")
+    for target, result in current['targets'].items():
+        old = baseline.get('targets', {}).get(target)
+        if not old:
+            continue
+        rows = [('total', result.get('total'), old.get('total'))]
+        rows += [(name, stats, old['stages'].get(name)) for name, stats in result['stages'].items()]
+        for name, new_stats, old_stats in rows:
+            if not new_stats or not old_stats:
+                continue
+            cells = []
+            for key in ('p50_ms', 'p99_ms'):
+                change = (new_stats[key] - old_stats[key]) / old_stats[key] * 100 if old_stats[key] else 0.0
+                cells.append(f"{old_stats[key]:.1f}->{new_stats[key]:.1f} ({change:+.0f}%)")
+            print(f"{target:<15}{name:<20}{cells[0]:>26}{cells[1]:>26}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--targets', default=','.join(TARGETS), help='Comma-separated subset of ' + ', '.join(TARGETS))
+    parser.add_argument('--queries', type=int, default=40, help='Queries sent to each target')
+    parser.add_argument('--unique-ratio', type=float, default=0.75, help='Share of distinct queries; the rest repeat')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--db-rows', type=int, default=10000, help='Synthetic rows pre-loaded into results.db')
+    parser.add_argument('--models', choices=('stub', 'tiny', 'real'), default='stub')
+    parser.add_argument('--browser', choices=('stub', 'real'), default='stub',
+                        help="'real' drives Playwright against the fixture server")
+    parser.add_argument('--ms-per-token', type=float, default=0.2, help='Simulated cost of the stub summarizer')
+    parser.add_argument('--page-latency-ms', type=float, default=200)
+    parser.add_argument('--search-latency-ms', type=float, default=100)
+    parser.add_argument('--data-dir', help='Directory for the SQLite files (default: a new temp dir)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='Write results as JSON to this path')
+    parser.add_argument('--compare', help='Baseline JSON from an earlier run')
+    args = parser.parse_args()
+
+    targets = [t.strip() for t in args.targets.split(',') if t.strip()]
+    unknown = set(targets) - set(TARGETS)
+    if unknown:
+        parser.error(f"unknown targets: {', '.join(sorted(unknown))}")
+
+    server, recorder, modules, setup_info = setup(args)
+    report = {'config': vars(args), 'setup': setup_info, 'started_at': time.time(),
+              'python': platform.python_version(), 'targets': {}}
+    try:
+        for target in targets:
+            queries = make_queries(target, args.queries, args.unique_ratio, args.seed)
+            recorder.reset()
+            if target == 'cli':
+                result = run_cli(queries, args.concurrency, modules)
+            else:
+                result = run_flask(modules[target].app, queries, args.concurrency, streaming=target == 'web_ui_stream')
+            result['stages'] = {name: summarize_samples(s) for name, s in sorted(recorder.samples.items())}
+            report['targets'][target] = result
+    finally:
+        server.stop()
+    report['fixture_requests'] = server.requests
+
+    for target, result in report['targets'].items():
+        print(f"\n== {target}: {result['throughput_qps']:.2f} queries/s over {result['wall_s']:.1f}s")
+        print(f"{'stage':<20}{'count':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        rows = [('total', result['total'])] + ([('first_summary', result['first_summary'])] if 'first_summary' in result else [])
+        for name, stats in rows + list(result['stages'].items()):
+            print(f"{name:<20}{stats['count']:>7}{stats['p50_ms']:>10.1f}{stats['p90_ms']:>10.1f}"
+                  f"{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.out}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Micro-benchmark of page extraction: the original path (html.parser + extract_main_content),
+the single-pass BeautifulSoup path (HTML_PARSER + extract_main_text) and parse_page, which
+fetch_page uses (lxml directly when installed).
+
+    python benchmarks/bench_extract.py                   # synthetic deep pages
+    python benchmarks/bench_extract.py --fixtures DIR    # every *.html file in DIR
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ripplica_agent'))
+
+from bs4 import BeautifulSoup
+from search_scraper import HTML_PARSER, extract_main_content, extract_main_text, parse_page
+
+
+def synthetic_page(depth: int, breadth: int) -> str:
+    """A page of nested <div> wrappers with navigation, scripts and paragraph text at every level."""
+    def block(level):
+        if level == depth:
+            return '<p>' + 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 4 + '</p>'
+        inner = ''.join(block(level + 1) for _ in range(breadth))
+        return f'<div class="l{level}"><a href="#">nav link {level}</a><script>var x = {level};</script>{inner}</div>'
+    return f'<html><head><title>Synthetic depth {depth}</title></head><body>{block(0)}</body></html>'
+
+
+def load_fixtures(path):
+    if path:
+        pages = {}
+        for name in sorted(glob.glob(os.path.join(path, '*.html'))):
+            with open(name, 'rb') as f:
+                pages[os.path.basename(name)] = f.read()
+        return pages
+    return {f'synthetic-d{d}-b{b}': synthetic_page(d, b).encode('utf-8')
+            for d, b in [(6, 3), (8, 3), (12, 2)]}
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', help='Directory of saved .html pages')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    pages = load_fixtures(args.fixtures)
+    if not pages:
+        sys.exit(f"No .html fixtures found in {args.fixtures}")
+    print(f"{'page':<28}{'KiB':>8}{'original ms':>13}{'single-pass ms':>16}{'parse_page ms':>15}{'speedup':>9}")
+    for name, html in pages.items():
+        original = best_of(lambda: extract_main_content(BeautifulSoup(html, 'html.parser')), args.repeat)
+        single_pass = best_of(lambda: extract_main_text(BeautifulSoup(html, HTML_PARSER)), args.repeat)
+        fast = best_of(lambda: parse_page(html), args.repeat)
+        print(f"{name:<28}{len(html) / 1024:>8.0f}{original * 1000:>13.1f}{single_pass * 1000:>16.1f}"
+              f"{fast * 1000:>15.1f}{original / fast:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
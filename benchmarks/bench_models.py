@@ -0,0 +1,197 @@
+"""
+Compares model backends for the summarizer and embedder on a fixed local corpus: the article
+fixtures in benchmarks/fixtures/ (or every *.html file in --fixtures), extracted with parse_page.
+
+Each variant runs in its own process so its peak RSS is measured in isolation. Summarizer
+variants are scored with ROUGE-1/2/L F1 against the first variant (the current pipeline:
+full-precision facebook/bart-large-cnn); embedder variants by mean cosine similarity to it.
+The summary cache is bypassed so every variant really runs the model.
+
+    python benchmarks/bench_models.py --out models.json
+    python benchmarks/bench_models.py --component embedder
+    python benchmarks/bench_models.py --variants torch:facebook/bart-large-cnn,int8:sshleifer/distilbart-cnn-12-6
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+AGENT_DIR = os.path.join(HERE, '..', 'ripplica_agent')
+FIXTURES_DIR = os.path.join(HERE, 'fixtures')
+
+# backend:model pairs; the first one is the reference the others are scored against
+DEFAULT_VARIANTS = {
+    'summarizer': ['torch:facebook/bart-large-cnn', 'int8:facebook/bart-large-cnn', 'onnx:facebook/bart-large-cnn',
+                   'torch:sshleifer/distilbart-cnn-12-6', 'int8:sshleifer/distilbart-cnn-12-6'],
+    'embedder': ['torch:all-MiniLM-L6-v2', 'int8:all-MiniLM-L6-v2', 'onnx:all-MiniLM-L6-v2'],
+}
+
+_TOKEN = re.compile(r'\w+')
+
+
+def load_corpus(path):
+    """Returns [(name, text)] for every article fixture, extracted the way fetch_page does it."""
+    from search_scraper import MAX_TEXT_CHARS, parse_page
+    corpus = []
+    for name in sorted(glob.glob(os.path.join(path, '*.html'))):
+        if os.path.basename(name).startswith('duckduckgo_'):
+            continue
+        with open(name, 'rb') as f:
+            _, text, _ = parse_page(f.read().replace(b'{title}', os.path.basename(name).encode('utf-8')), MAX_TEXT_CHARS)
+        corpus.append((os.path.basename(name), text))
+    return corpus
+
+
+def peak_rss_bytes():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+
+def run_worker(spec):
+    """Loads one variant in this process, runs it over the corpus and returns its measurements."""
+    import inference
+    import model_backends
+    # The variant must load in this process to be measured; never hand it to an inference server
+    inference.INFERENCE_SOCKET = None
+    model_backends.MODEL_BACKEND = spec['backend']
+    corpus = load_corpus(spec['fixtures'])
+    baseline_rss = peak_rss_bytes()
+    start = time.perf_counter()
+    if spec['component'] == 'summarizer':
+        import summarizer
+
+        class NoCache:
+            def get(self, key):
+                return None
+
+            def put(self, key, summary):
+                pass
+
+        summarizer.MODEL_NAME = spec['model']
+        summarizer.get_summary_cache = NoCache
+        summarizer.get_summarizer()
+        run = lambda text: summarizer.summarize_pages([text])[0]
+    else:
+        import embeddings
+        embeddings.MODEL_NAME = spec['model']
+        model = embeddings.get_model()
+        # Embed page text directly: the query memo would turn repeats into dictionary lookups
+        run = lambda text: model.encode([text], normalize_embeddings=True)[0].tolist()
+    load_s = time.perf_counter() - start
+    latencies, outputs = [], {}
+    for _ in range(spec['repeats']):
+        for name, text in corpus:
+            start = time.perf_counter()
+            outputs[name] = run(text)
+            latencies.append(time.perf_counter() - start)
+    return {'load_s': load_s, 'latencies_s': latencies, 'peak_rss_bytes': peak_rss_bytes(),
+            'baseline_rss_bytes': baseline_rss, 'outputs': outputs}
+
+
+def _ngrams(tokens, n):
+    return Counter(tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+
+
+def _f1(overlap, candidate_total, reference_total):
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / candidate_total, overlap / reference_total
+    return 2 * precision * recall / (precision + recall)
+
+
+def _lcs(a, b):
+    row = [0] * (len(b) + 1)
+    for x in a:
+        prev = 0
+        for j, y in enumerate(b, 1):
+            prev, row[j] = row[j], prev + 1 if x == y else max(row[j], row[j - 1])
+    return row[-1]
+
+
+def rouge(candidate, reference):
+    """ROUGE-1, ROUGE-2 and ROUGE-L F1 of candidate against reference on lowercased word tokens."""
+    cand, ref = _TOKEN.findall(candidate.lower()), _TOKEN.findall(reference.lower())
+    scores = {}
+    for n in (1, 2):
+        c, r = _ngrams(cand, n), _ngrams(ref, n)
+        scores[f'rouge{n}'] = _f1(sum((c & r).values()), sum(c.values()), sum(r.values()))
+    scores['rougeL'] = _f1(_lcs(cand, ref), len(cand), len(ref))
+    return scores
+
+
+def run_variant(component, variant, fixtures, repeats):
+    backend, model = variant.split(':', 1)
+    spec = {'component': component, 'backend': backend, 'model': model, 'fixtures': fixtures, 'repeats': repeats}
+    env = dict(os.environ, RIPPLICA_DATA_DIR=os.environ.get('RIPPLICA_DATA_DIR') or tempfile.mkdtemp(prefix='ripplica-models-'))
+    env.pop('RIPPLICA_INFERENCE_SOCKET', None)
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', json.dumps(spec)],
+                          capture_output=True, text=True, env=env)
+    if proc.returncode != 0:
+        return {'variant': variant, 'error': (proc.stderr.strip().splitlines() or ['failed'])[-1]}
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result['variant'] = variant
+    return result
+
+
+def score(component, result, reference):
+    names = sorted(set(result['outputs']) & set(reference['outputs']))
+    if component == 'summarizer':
+        per_doc = [rouge(result['outputs'][n], reference['outputs'][n]) for n in names]
+        return {key: float(np.mean([s[key] for s in per_doc])) for key in ('rouge1', 'rouge2', 'rougeL')}
+    sims = [float(np.dot(result['outputs'][n], reference['outputs'][n])) for n in names]
+    return {'cosine': float(np.mean(sims))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--component', choices=sorted(DEFAULT_VARIANTS), default='summarizer')
+    parser.add_argument('--variants', help='Comma-separated backend:model pairs; the first is the reference')
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help='Directory of saved .html pages')
+    parser.add_argument('--repeats', type=int, default=3, help='Passes over the corpus per variant')
+    parser.add_argument('--out', help='Write results as JSON to this path')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    sys.path.insert(0, AGENT_DIR)
+    if args.worker:
+        print(json.dumps(run_worker(json.loads(args.worker))))
+        return
+
+    variants = [v.strip() for v in args.variants.split(',')] if args.variants else DEFAULT_VARIANTS[args.component]
+    results = []
+    for variant in variants:
+        print(f"Running {variant}...", file=sys.stderr)
+        results.append(run_variant(args.component, variant, args.fixtures, args.repeats))
+    reference = results[0]
+    if 'error' in reference:
+        sys.exit(f"Reference variant {reference['variant']} failed: {reference['error']}")
+
+    quality = ('rouge1', 'rouge2', 'rougeL') if args.component == 'summarizer' else ('cosine',)
+    print(f"\n{'variant':<42}{'load s':>8}{'p50 ms':>10}{'p90 ms':>10}{'peak MB':>9}" + ''.join(f"{q:>9}" for q in quality))
+    for result in results:
+        if 'error' in result:
+            print(f"{result['variant']:<42}  failed: {result['error']}")
+            continue
+        result['quality'] = score(args.component, result, reference)
+        ms = np.asarray(result['latencies_s']) * 1000
+        result['p50_ms'], result['p90_ms'] = float(np.percentile(ms, 50)), float(np.percentile(ms, 90))
+        print(f"{result['variant']:<42}{result['load_s']:>8.1f}{result['p50_ms']:>10.1f}{result['p90_ms']:>10.1f}"
+              f"{result['peak_rss_bytes'] / 2**20:>9.0f}" + ''.join(f"{result['quality'][q]:>9.3f}" for q in quality))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'component': args.component, 'repeats': args.repeats, 'results': results}, f, indent=2)
+        print(f"\nWrote {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Local stand-in for DuckDuckGo and the result sites, serving the saved pages in fixtures/.
+
+    /search?q=...   DuckDuckGo-style results page linking to RESULTS_PER_PAGE articles
+    /article/<n>    one of the article fixtures, with ETag support and simulated latency
+"""
+import glob
+import hashlib
+import html
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+RESULTS_PER_PAGE = 8
+
+
+def _read(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+class FixtureServer:
+    """
+    Threaded HTTP server on 127.0.0.1. Article latency is drawn from a log-normal distribution
+    around page_latency_ms (deterministic per article), so a batch has fast and slow pages.
+    """
+
+    def __init__(self, page_latency_ms: float = 200, search_latency_ms: float = 100, port: int = 0):
+        self.page_latency_ms = page_latency_ms
+        self.search_latency_ms = search_latency_ms
+        self.results_page = _read('duckduckgo_results.html')
+        self.result_item = _read('duckduckgo_result.html')
+        self.articles = [_read(os.path.basename(p)) for p in sorted(glob.glob(os.path.join(FIXTURES_DIR, 'article_*.html')))]
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self._server.server_address[1]}'
+
+    @property
+    def search_url(self):
+        """Template for search_scraper.SEARCH_URL."""
+        return self.base_url + '/search?q={query}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fixture-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def article_latency(self, n: int) -> float:
+        return random.Random(n).lognormvariate(0, 0.6) * self.page_latency_ms / 1000
+
+    def render_results(self, query: str) -> str:
+        seed = int(hashlib.sha1(query.encode('utf-8')).hexdigest()[:8], 16)
+        items = []
+        for rank in range(RESULTS_PER_PAGE):
+            n = (seed + rank * 7919) % 100000
+            items.append(self.result_item
+                         .replace('{url}', f'{self.base_url}/article/{n}')
+                         .replace('{title}', html.escape(f'{query} - result {rank + 1}'))
+                         .replace('{snippet}', html.escape(f'Snippet for {query}')))
+        return self.results_page.replace('{query}', html.escape(query)).replace('{results}', '\n'.join(items))
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                parts = urlsplit(self.path)
+                if parts.path == '/search':
+                    time.sleep(server.search_latency_ms / 1000)
+                    query = parse_qs(parts.query).get('q', [''])[0]
+                    return self._send(200, server.render_results(query))
+                if parts.path.startswith('/article/'):
+                    n = int(parts.path.rsplit('/', 1)[1])
+                    etag = f'"article-{n}"'
+                    if self.headers.get('If-None-Match') == etag:
+                        return self._send(304, '', etag=etag)
+                    time.sleep(server.article_latency(n))
+                    page = server.articles[n % len(server.articles)].replace('{title}', f'Article {n}')
+                    return self._send(200, page, etag=etag)
+                self._send(404, 'not found')
+
+            def _send(self, status, body, etag=None):
+                data = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                if etag:
+                    self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,103 @@
+"""
+Offline stand-ins for the heavy dependencies: a hashed bag-of-words embedder, a lead-sentence
+summarizer with a simulated per-token cost, and an HTTP-backed page for the browser pool.
+"""
+import hashlib
+import re
+import time
+import numpy as np
+import requests
+
+EMBEDDING_DIM = 384     # Same width as all-MiniLM-L6-v2
+
+_WORD = re.compile(r'\w+')
+
+
+class StubEncoder:
+    """Deterministic SentenceTransformer replacement: hashed bag of words, unit length."""
+
+    def encode(self, texts, batch_size=None, convert_to_numpy=True, normalize_embeddings=False, **kwargs):
+        out = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in _WORD.findall(text.lower()):
+                bucket = int(hashlib.md5(word.encode('utf-8')).hexdigest()[:8], 16)
+                out[row, bucket % EMBEDDING_DIM] += 1.0 if bucket & 1 else -1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+
+class StubTokenizer:
+    def __call__(self, text, add_special_tokens=False, **kwargs):
+        if isinstance(text, str):
+            return {'input_ids': text.split()}
+        return {'input_ids': [t.split() for t in text]}
+
+    def decode(self, ids, **kwargs):
+        return ' '.join(ids)
+
+
+class StubSummarizer:
+    """
+    Summarization-pipeline replacement returning the leading words of each input. Sleeps
+    ms_per_token per input token (plus a fixed per-call overhead) to model CPU cost.
+    """
+
+    def __init__(self, ms_per_token: float = 0.2, ms_per_call: float = 5):
+        self.tokenizer = StubTokenizer()
+        self.ms_per_token = ms_per_token
+        self.ms_per_call = ms_per_call
+
+    def __call__(self, texts, max_length=120, **kwargs):
+        batch = [texts] if isinstance(texts, str) else list(texts)
+        tokens = sum(len(t.split()) for t in batch)
+        time.sleep((self.ms_per_call + tokens * self.ms_per_token) / 1000)
+        return [{'summary_text': ' '.join(t.split()[:max_length // 2])} for t in batch]
+
+
+class HttpElement:
+    def __init__(self, element):
+        self._element = element
+
+    def get_attribute(self, name):
+        return self._element.get(name)
+
+
+class HttpPage:
+    """
+    Minimal Playwright page for the fixture server: supports exactly what
+    search_scraper.find_result_urls does on a DuckDuckGo results page.
+    """
+
+    _RESULT_LINKS = ('//a[@data-testid="result-title-a"]'
+                     ' | //a[contains(concat(" ", normalize-space(@class), " "), " result__a ")]')
+
+    def __init__(self, session: requests.Session):
+        self._session = session
+        self._doc = None
+
+    def goto(self, url):
+        import lxml.html
+        self._doc = lxml.html.fromstring(self._session.get(url, timeout=10).content)
+
+    def wait_for_selector(self, selector, timeout=None):
+        if not self.query_selector_all(selector):
+            raise TimeoutError(f"No element matches {selector}")
+
+    def query_selector_all(self, selector):
+        if self._doc is None or 'result' not in selector:
+            return []
+        return [HttpElement(a) for a in self._doc.xpath(self._RESULT_LINKS)]
+
+
+class HttpBrowserPool:
+    """Drop-in for browser_pool.BrowserPool that runs page jobs against HttpPage in the caller's thread."""
+
+    def __init__(self):
+        self._session = requests.Session()
+
+    def run(self, fn, timeout=None):
+        return fn(HttpPage(self._session))
+
+    def close(self):
+        self._session.close()
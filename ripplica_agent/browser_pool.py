@@ -0,0 +1,159 @@
+import atexit
+import queue
+import threading
+from concurrent.futures import Future
+from playwright.sync_api import sync_playwright
+
+MAX_BROWSERS = 2            # Live headless browsers shared by all callers in this process
+CONTEXT_MAX_USES = 20       # Pages served by one browser context before it is recycled
+LEASE_TIMEOUT = 60          # Seconds a caller waits for its page job to finish
+
+
+class BrowserPool:
+    """
+    Long-lived pool of headless Firefox browsers.
+
+    Playwright's sync API is bound to the thread that started it, so each browser lives on its
+    own worker thread and callers lease a fresh page by handing a function to run(). Workers are
+    started on demand up to max_browsers; contexts are recycled after max_uses pages or when a
+    job fails, and a disconnected browser is relaunched on the next job.
+    """
+
+    def __init__(self, max_browsers: int = MAX_BROWSERS, max_uses: int = CONTEXT_MAX_USES):
+        self.max_browsers = max_browsers
+        self.max_uses = max_uses
+        self._jobs = queue.Queue()
+        self._workers = []
+        self._idle = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def submit(self, fn) -> Future:
+        """Queues fn(page) to run on a pooled browser and returns a Future for its result."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Browser pool is closed")
+            if self._idle == 0 and len(self._workers) < self.max_browsers:
+                worker = threading.Thread(target=self._worker, name=f'browser-{len(self._workers)}', daemon=True)
+                self._workers.append(worker)
+                worker.start()
+            self._jobs.put((fn, future))
+        return future
+
+    def run(self, fn, timeout: float = LEASE_TIMEOUT):
+        """Runs fn(page) on a pooled browser and returns its result."""
+        return self.submit(fn).result(timeout=timeout)
+
+    def close(self, timeout: float = 10):
+        """Stops all workers and closes their browsers."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers)
+        for _ in workers:
+            self._jobs.put(None)
+        for worker in workers:
+            worker.join(timeout)
+
+    def _worker(self):
+        try:
+            p = sync_playwright().start()
+        except Exception as e:
+            # Driver or browsers missing: this worker will never serve. Leave its slot free for the
+            # next submit and fail the waiting callers now instead of after LEASE_TIMEOUT
+            with self._lock:
+                self._workers.remove(threading.current_thread())
+                others = len(self._workers)
+            self._fail_queued(e, limit=1 if others else None)
+            return
+        try:
+            self._serve(p)
+        finally:
+            _quietly(p.stop)
+
+    def _fail_queued(self, error: Exception, limit: int = None):
+        failed = 0
+        while limit is None or failed < limit:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                return
+            if job is None:
+                # A close() sentinel for another worker
+                self._jobs.put(None)
+                return
+            fn, future = job
+            if future.set_running_or_notify_cancel():
+                future.set_exception(error)
+            failed += 1
+
+    def _serve(self, p):
+        browser = context = None
+        uses = 0
+        while True:
+            with self._lock:
+                self._idle += 1
+            job = self._jobs.get()
+            with self._lock:
+                self._idle -= 1
+            if job is None:
+                break
+            fn, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if browser is None or not browser.is_connected():
+                    browser = p.firefox.launch(headless=True)
+                    context = None
+                if context is None:
+                    context = browser.new_context()
+                    uses = 0
+                page = context.new_page()
+                try:
+                    result = fn(page)
+                finally:
+                    _quietly(page.close)
+                uses += 1
+                if uses >= self.max_uses:
+                    _quietly(context.close)
+                    context = None
+                future.set_result(result)
+            except Exception as e:
+                # Recycle the context after any failure in case the page or browser crashed
+                if context is not None:
+                    _quietly(context.close)
+                context = None
+                future.set_exception(e)
+        if browser is not None:
+            _quietly(browser.close)
+
+
+def _quietly(close):
+    try:
+        close()
+    except Exception:
+        pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_browser_pool() -> BrowserPool:
+    """
+    Returns the process-wide browser pool, creating it on first use.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+            atexit.register(_pool.close)
+        return _pool
+
+def shutdown_browser_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
@@ -0,0 +1,155 @@
+import contextvars
+import threading
+from typing import Callable, Iterable, List, Optional, Tuple
+import numpy as np
+from embeddings import normalize_query
+from metrics import record_cache
+
+SIMILARITY_THRESHOLD = 0.8      # Same cut-off storage uses to answer from a past query
+
+
+class Flight:
+    """
+    One in-progress pipeline run shared by every request that matches it: the events it has
+    emitted so far and, once finished, its result or exception.
+    """
+
+    def __init__(self, query: str, embedding: np.ndarray):
+        self.query = query
+        self.key = normalize_query(query)
+        self.embedding = embedding
+        self.events: List = []
+        self.done = False
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self._cond = threading.Condition()
+
+    def publish(self, event):
+        with self._cond:
+            self.events.append(event)
+            self._cond.notify_all()
+
+    def finish(self, result=None, error: BaseException = None):
+        with self._cond:
+            self.result, self.error, self.done = result, error, True
+            self._cond.notify_all()
+
+    def wait(self, timeout: float = None):
+        """Blocks until the run finishes and returns its result (re-raising its exception)."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.done, timeout):
+                raise TimeoutError(f"Query still running after {timeout}s: {self.query}")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def subscribe(self) -> Iterable:
+        """
+        Yields every event of the run from the first one: events already published are
+        replayed, then new ones are yielded as they are published until the run finishes.
+        """
+        seen = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: seen < len(self.events) or self.done)
+                new, done = self.events[seen:], self.done
+            seen += len(new)
+            yield from new
+            if done:
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+class Coalescer:
+    """
+    Single-flight registry for the search-and-summarize pipeline. A query whose normalized
+    text equals, or whose embedding is within threshold of, a query already being answered
+    attaches to that run instead of starting its own browser search and summarization.
+    """
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self._flights: List[Flight] = []
+        self._lock = threading.Lock()
+
+    def _match(self, key: str, embedding: np.ndarray) -> Optional[Flight]:
+        for flight in self._flights:
+            if flight.key == key:
+                return flight
+        best, best_sim = None, self.threshold
+        for flight in self._flights:
+            # Embeddings are unit length, so the dot product is the cosine similarity
+            sim = float(np.dot(flight.embedding, embedding))
+            if sim >= best_sim:
+                best, best_sim = flight, sim
+        return best
+
+    def join(self, query: str, embedding: np.ndarray) -> Tuple[Flight, bool]:
+        """
+        Returns (flight, leader). The leader is the first request for the query and must run
+        the pipeline (via start, or by finishing the flight itself); others only read from it.
+        """
+        with self._lock:
+            flight = self._match(normalize_query(query), embedding)
+            leader = flight is None
+            if leader:
+                flight = Flight(query, embedding)
+                self._flights.append(flight)
+        record_cache('inflight', not leader)
+        return flight, leader
+
+    def _release(self, flight: Flight):
+        with self._lock:
+            if flight in self._flights:
+                self._flights.remove(flight)
+
+    def run(self, query: str, embedding: np.ndarray, fn: Callable):
+        """
+        Returns fn() for the query. The leader calls fn in its own thread; concurrent matching
+        requests wait for and share its result (or exception).
+        """
+        flight, leader = self.join(query, embedding)
+        if not leader:
+            return flight.wait()
+        try:
+            result = fn()
+            flight.finish(result)
+            return result
+        except BaseException as e:
+            flight.finish(error=e)
+            raise
+        finally:
+            self._release(flight)
+
+    def start(self, flight: Flight, produce: Callable[[], Iterable]):
+        """
+        Runs the produce() generator for a flight this caller leads on a background thread,
+        publishing each event it yields. The run is decoupled from the leader's own client,
+        so it completes (and is saved) for the other subscribers even if the leader goes away.
+        """
+        def drive():
+            error = None
+            try:
+                for event in produce():
+                    flight.publish(event)
+            except Exception as e:
+                error = e
+            finally:
+                flight.finish(error=error)
+                self._release(flight)
+        # Run in a copy of the caller's context so stage timings reach its trace
+        ctx = contextvars.copy_context()
+        threading.Thread(target=ctx.run, args=(drive,), name='coalesced-query', daemon=True).start()
+
+
+_coalescer = None
+_coalescer_lock = threading.Lock()
+
+def get_coalescer() -> Coalescer:
+    """Returns the process-wide coalescer."""
+    global _coalescer
+    with _coalescer_lock:
+        if _coalescer is None:
+            _coalescer = Coalescer()
+        return _coalescer
@@ -0,0 +1,4 @@
+import os
+
+# Directory holding the SQLite files and exported models; override with RIPPLICA_DATA_DIR
+DATA_DIR = os.environ.get('RIPPLICA_DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
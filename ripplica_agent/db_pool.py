@@ -0,0 +1,77 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+BUSY_TIMEOUT_MS = 5000      # How long a writer waits on a locked database before failing
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of persistent SQLite connections to one database file.
+
+    Connections are opened lazily up to size and switched to WAL journaling, so readers never
+    block on the single writer and a commit is one sequential append to the log rather than a
+    rewrite of the rollback journal. Callers borrow a connection with `with pool.connection() as conn:`.
+    """
+
+    def __init__(self, path: str, size: int = 8):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        # With WAL, NORMAL only syncs at checkpoints; a crash can lose the last commits but never corrupts
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"Connection pool for {self.path} is closed")
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return self._open()
+                except Exception:
+                    self._opened -= 1
+                    raise
+        return self._idle.get()
+
+    @contextmanager
+    def connection(self):
+        """
+        Lends a connection for the enclosed block, committing on success and rolling back on error.
+        """
+        conn = self._acquire()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            if self._closed:
+                conn.close()
+            else:
+                self._idle.put(conn)
+
+    def close(self):
+        """Closes idle connections; borrowed ones are closed as they are returned."""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
@@ -0,0 +1,97 @@
+import re
+from typing import List, Optional
+import numpy as np
+
+SHINGLE_WORDS = 5               # Words per shingle
+NUM_PERM = 128                  # MinHash permutations; the Jaccard estimate's error is about 1/sqrt(NUM_PERM)
+DUPLICATE_THRESHOLD = 0.8       # Estimated Jaccard similarity at which two pages count as the same article
+MIN_SHINGLES = 10               # Pages shorter than this (errors, stubs) are never treated as duplicates
+BOILERPLATE_SHARE = 0.6         # Shingles on at least this share of pages (and 3+ pages) are boilerplate
+BOILERPLATE_MAX_CUT = 0.5       # Largest share of a page's remaining shingles one boilerplate level may strip
+
+_WORD = re.compile(r'\w+')
+# Largest prime below 2**32. a * x + b must wrap around it many times to act like a random
+# permutation; with a much larger modulus the order barely differs from sorting by x
+_PRIME = (1 << 32) - 5
+_rng = np.random.default_rng(0)
+_A = _rng.integers(1, _PRIME, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, size=NUM_PERM, dtype=np.uint64)
+
+
+def shingle_hashes(text: str, k: int = SHINGLE_WORDS) -> np.ndarray:
+    """Returns the distinct 32-bit hashes of the text's lowercased k-word shingles."""
+    words = _WORD.findall(text.lower())
+    if len(words) < k:
+        return np.empty(0, dtype=np.uint64)
+    return np.unique(np.fromiter((hash(' '.join(words[i:i + k])) & 0xFFFFFFFF for i in range(len(words) - k + 1)),
+                                 dtype=np.uint64))
+
+def minhash(hashes: np.ndarray) -> np.ndarray:
+    """MinHash signature of a shingle set: its minimum under each of NUM_PERM universal hash functions."""
+    # a, b < _PRIME and x < 2**32 keep a * x + b below 2**64, so uint64 arithmetic never overflows
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+
+def _drop_boilerplate(sets: List[np.ndarray]) -> List[np.ndarray]:
+    # Navigation, cookie banners and footers repeat on most pages of a result list and would make
+    # unrelated pages look alike. Chrome is a minority of a page, though: shared shingles are stripped
+    # from the most widespread down, stopping before a page would lose most of what is left, so
+    # several copies of one article keep the article text they share
+    if len(sets) < 3:
+        return sets
+    values, counts = np.unique(np.concatenate(sets), return_counts=True)
+    common = counts >= max(3, BOILERPLATE_SHARE * len(sets))
+    if not common.any():
+        return sets
+    values, counts = values[common], counts[common]
+    stripped = []
+    for s in sets:
+        for level in np.unique(counts)[::-1]:
+            rest = s[~np.isin(s, values[counts == level])]
+            if len(rest) < MIN_SHINGLES or len(rest) <= (1 - BOILERPLATE_MAX_CUT) * len(s):
+                break
+            s = rest
+        stripped.append(s)
+    return stripped
+
+def _canonical_of(index: int, signatures, canonical, threshold: float) -> Optional[int]:
+    if signatures[index] is None:
+        return None
+    for j in range(index):
+        if canonical[j] is None and signatures[j] is not None:
+            if float(np.mean(signatures[index] == signatures[j])) >= threshold:
+                return j
+    return None
+
+def _signatures(sets: List[np.ndarray]):
+    return [minhash(s) if len(s) >= MIN_SHINGLES else None for s in _drop_boilerplate(sets)]
+
+def find_duplicates(texts: List[str], threshold: float = DUPLICATE_THRESHOLD) -> List[Optional[int]]:
+    """
+    Returns, for each text, the index of the earlier text it near-duplicates (the canonical
+    page, which is itself not a duplicate), or None if it is distinct.
+    """
+    signatures = _signatures([shingle_hashes(t) for t in texts])
+    canonical = []
+    for i in range(len(texts)):
+        canonical.append(_canonical_of(i, signatures, canonical, threshold))
+    return canonical
+
+
+class DuplicateDetector:
+    """
+    Incremental find_duplicates for pages that arrive one at a time (the streaming UI).
+    Boilerplate is judged over the pages seen so far.
+    """
+
+    def __init__(self, threshold: float = DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self._sets = []
+        self._canonical = []
+
+    def add(self, text: str) -> Optional[int]:
+        """Adds the next page and returns the index (in add order) of the earlier page it duplicates, or None."""
+        self._sets.append(shingle_hashes(text))
+        signatures = _signatures(self._sets)
+        match = _canonical_of(len(self._sets) - 1, signatures, self._canonical, self.threshold)
+        self._canonical.append(match)
+        return match
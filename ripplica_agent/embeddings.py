@@ -1,10 +1,75 @@
-from sentence_transformers import SentenceTransformer
+import threading
+from collections import OrderedDict
+from typing import List
 import numpy as np
+import inference
+import model_backends
 
-model = SentenceTransformer('all-MiniLM-L6-v2')
+MODEL_NAME = 'all-MiniLM-L6-v2'
+BATCH_SIZE = 64         # Texts per model.encode forward pass
+MEMO_SIZE = 4096        # Normalized queries whose embeddings are kept in memory
+
+_model = None
+_model_lock = threading.Lock()
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+def get_model():
+    """
+    Returns the SentenceTransformer model on the configured backend, loading it on first use.
+    """
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = model_backends.load_embedder(MODEL_NAME)
+        return _model
+
+def normalize_query(text: str) -> str:
+    """Memo key for a query: lowercased with whitespace collapsed (the model is uncased)."""
+    return ' '.join(text.lower().split())
+
+def get_embeddings(texts: List[str], batch_size: int = None) -> np.ndarray:
+    """
+    Embeds many texts at once and returns an (n, dim) float32 matrix of unit-length rows,
+    so similarity between any two embeddings is a plain dot product. Texts already seen
+    (after normalize_query) are served from an in-memory LRU memo; the rest are encoded
+    in batches of batch_size, each distinct text once.
+    """
+    keys = [normalize_query(t) for t in texts]
+    found = {}
+    with _memo_lock:
+        for key in keys:
+            if key in _memo and key not in found:
+                _memo.move_to_end(key)
+                found[key] = _memo[key]
+    missing = list(dict.fromkeys(k for k in keys if k not in found))
+    if missing:
+        vectors = encode(missing, batch_size)
+        with _memo_lock:
+            for key, vec in zip(missing, vectors):
+                vec = vec.copy()
+                vec.flags.writeable = False
+                found[key] = _memo[key] = vec
+                _memo.move_to_end(key)
+            while len(_memo) > MEMO_SIZE:
+                _memo.popitem(last=False)
+    if not keys:
+        return np.empty((0, 0), dtype=np.float32)
+    return np.stack([found[key] for key in keys])
+
+def encode(texts: List[str], batch_size: int = None) -> np.ndarray:
+    """
+    Runs the model on texts (no memo) and returns unit-length float32 rows, using the shared
+    inference server when one is configured.
+    """
+    vectors = inference.embed(texts)
+    if vectors is None:
+        vectors = get_model().encode(texts, batch_size=batch_size or BATCH_SIZE,
+                                     convert_to_numpy=True, normalize_embeddings=True)
+    return np.asarray(vectors, dtype=np.float32)
 
 def get_embedding(text: str) -> np.ndarray:
-    return model.encode([text])[0]
+    return get_embeddings([text])[0]
 
 def cosine_similarity(vec1: np.ndarray, vec2: np.ndarray) -> float:
-    return np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2)) 
\ No newline at end of file
+    return np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
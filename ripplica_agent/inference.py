@@ -0,0 +1,196 @@
+import base64
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+import numpy as np
+
+# Unix socket of the shared inference server; when set, embeddings and summarizer send their
+# model calls there instead of loading the models in every worker process
+INFERENCE_SOCKET = os.environ.get('RIPPLICA_INFERENCE_SOCKET')
+MAX_BATCH = 16          # Inputs per model call, across all concurrent requests
+MAX_WAIT_MS = 10        # How long the first input of a batch waits for others to join it
+CLIENT_TIMEOUT = 300    # Seconds a client waits for the server to answer
+
+_serving = False        # True inside the server process, which must run the models itself
+_warned = False
+
+
+class MicroBatcher:
+    """
+    Collects inputs submitted by many threads into dynamic batches for fn(list) -> list.
+    A batch is run once it holds max_batch inputs or max_wait_ms after its first input
+    arrived, whichever comes first; one worker thread runs the batches in order.
+    """
+
+    def __init__(self, fn: Callable[[List], List], max_batch: int = MAX_BATCH,
+                 max_wait_ms: float = MAX_WAIT_MS, name: str = 'micro-batcher'):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._worker, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, items: List) -> List:
+        """Runs items through fn as part of one or more shared batches and returns their outputs in order."""
+        if not items:
+            return []
+        future = Future()
+        self._queue.put((list(items), future))
+        return future.result()
+
+    def _worker(self):
+        while True:
+            pending = [self._queue.get()]
+            size = len(pending[0][0])
+            deadline = time.monotonic() + self.max_wait_ms / 1000
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending.append(request)
+                size += len(request[0])
+            self._run(pending)
+
+    def _run(self, pending):
+        flat = [item for items, _ in pending for item in items]
+        try:
+            outputs = []
+            for start in range(0, len(flat), self.max_batch):
+                outputs.extend(self.fn(flat[start:start + self.max_batch]))
+        except Exception as e:
+            for _, future in pending:
+                future.set_exception(e)
+            return
+        offset = 0
+        for items, future in pending:
+            future.set_result(outputs[offset:offset + len(items)])
+            offset += len(items)
+
+
+def _connect() -> socket.socket:
+    # A full accept backlog shows up as EAGAIN on Unix sockets; that is load, not absence, so retry
+    for attempt in range(50):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(CLIENT_TIMEOUT)
+        try:
+            sock.connect(INFERENCE_SOCKET)
+            return sock
+        except BlockingIOError:
+            sock.close()
+            time.sleep(0.01 * (attempt + 1))
+        except OSError:
+            sock.close()
+            raise
+    raise BlockingIOError(f"Inference server at {INFERENCE_SOCKET} is not accepting connections")
+
+def _request(payload: dict) -> Optional[dict]:
+    # None when no server is configured, reachable or able to answer, so the caller runs the model in-process
+    if _serving or not INFERENCE_SOCKET:
+        return None
+    try:
+        with _connect() as sock, sock.makefile('rwb') as stream:
+            stream.write((json.dumps(payload) + '\n').encode('utf-8'))
+            stream.flush()
+            # An empty line (server closed mid-request) fails to parse like a truncated one
+            response = json.loads(stream.readline())
+    except (OSError, ValueError) as e:
+        _fall_back(e)
+        return None
+    if 'error' in response:
+        _fall_back(f"server error: {response['error']}")
+        return None
+    return response
+
+def _fall_back(reason):
+    global _warned
+    if not _warned:
+        _warned = True
+        print(f"[DEBUG] Inference server at {INFERENCE_SOCKET} unavailable ({reason}); loading models in-process",
+              file=sys.stderr)
+
+def embed(texts: List[str]) -> Optional[np.ndarray]:
+    """Unit-length float32 embeddings from the inference server, or None to embed locally."""
+    response = _request({'op': 'embed', 'texts': texts})
+    if response is None:
+        return None
+    data = np.frombuffer(base64.b64decode(response['embeddings']), dtype=np.float32)
+    return data.reshape(response['shape'])
+
+def summarize(texts: List[str]) -> Optional[List[str]]:
+    """One summary per page text from the inference server, or None to summarize locally."""
+    response = _request({'op': 'summarize', 'texts': texts})
+    return None if response is None else response['summaries']
+
+
+class _InferenceHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            request = json.loads(line)
+            try:
+                response = self.server.dispatch(request)
+            except Exception as e:
+                response = {'error': str(e)}
+            self.wfile.write((json.dumps(response) + '\n').encode('utf-8'))
+            self.wfile.flush()
+
+
+class InferenceServer(socketserver.ThreadingUnixStreamServer):
+    """
+    Owns the embedding and summarization models for every worker process on the machine.
+    Each connection is served on its own thread; their model inputs meet in two MicroBatchers.
+    """
+
+    daemon_threads = True
+    request_queue_size = 128    # Every worker thread may connect at once
+
+    def __init__(self, socket_path: str, max_batch: int = MAX_BATCH, max_wait_ms: float = MAX_WAIT_MS):
+        import embeddings
+        import summarizer
+        self.summarizer = summarizer
+        self.embed_batcher = MicroBatcher(lambda texts: list(embeddings.encode(texts)), max_batch, max_wait_ms,
+                                          name='embed-batcher')
+        self.summary_batcher = MicroBatcher(lambda chunks: summarizer._run_batch(chunks), max_batch, max_wait_ms,
+                                            name='summary-batcher')
+        super().__init__(socket_path, _InferenceHandler)
+
+    def dispatch(self, request: dict) -> dict:
+        if request['op'] == 'embed':
+            vectors = np.asarray(self.embed_batcher.submit(request['texts']), dtype=np.float32)
+            return {'embeddings': base64.b64encode(vectors.tobytes()).decode('ascii'), 'shape': list(vectors.shape)}
+        if request['op'] == 'summarize':
+            # Chunking and the summary cache run per request; only the model calls are batched
+            return {'summaries': self.summarizer.summarize_pages(request['texts'], run_batch=self.summary_batcher.submit)}
+        raise ValueError(f"Unknown op {request['op']!r}")
+
+
+def serve(socket_path: str, max_batch: int = MAX_BATCH, max_wait_ms: float = MAX_WAIT_MS, ready: Callable = None):
+    """Loads both models and serves inference requests on socket_path until interrupted."""
+    global _serving
+    _serving = True
+    import embeddings
+    import summarizer
+    embeddings.get_model()
+    summarizer.get_summarizer()
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = InferenceServer(socket_path, max_batch, max_wait_ms)
+    if ready:
+        ready()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
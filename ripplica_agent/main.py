@@ -1,50 +1,279 @@
+import contextlib
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import click
+import numpy as np
 from query_validator import is_valid_query
-from embeddings import get_embedding
-from storage import get_similar, save_result
-from search_scraper import search_and_scrape
-from summarizer import summarize_texts
+from embeddings import get_embedding, get_embeddings, get_model, normalize_query
+from storage import compact, get_index, get_similar_items
+from summarizer import format_summary, get_summarizer
+from pipeline import answer_query
+from browser_pool import get_browser_pool, shutdown_browser_pool
+from metrics import record_cache, stage, start_trace
+import inference
+
+# Unix socket the `serve` daemon listens on; `ask` becomes a thin client when it is up
+SOCKET_PATH = os.environ.get('RIPPLICA_SOCKET', os.path.join(tempfile.gettempdir(), 'ripplica_agent.sock'))
+INFERENCE_SOCKET_PATH = os.path.join(tempfile.gettempdir(), 'ripplica_inference.sock')
 
 @click.group()
 def cli():
     """Web Query Agent: Search, summarize, and remember your queries!"""
     pass
 
+def run_query(query, debug=False, echo=click.secho):
+    """
+    Runs the full ask pipeline for one query, writing all output through echo(message, fg=None).
+    With debug, a per-stage timing breakdown is printed at the end.
+    """
+    trace = start_trace()
+    try:
+        _run_query(query, debug, echo)
+    finally:
+        if debug:
+            echo("\n" + trace.format(), fg='magenta')
+
+def _run_query(query, debug, echo):
+    echo(f"\n🕵️  Query: {query}", fg='cyan')
+    with stage('validate'):
+        valid = is_valid_query(query)
+    if not valid:
+        echo("❌ This is not a valid query. Please enter a web search question.", fg='red')
+        return
+    with stage('embed'):
+        embedding = get_embedding(query)
+    with stage('lookup'):
+        similar = get_similar_items(embedding)
+    record_cache('query', similar is not None)
+    if similar:
+        q, items, sim = similar
+        echo(f"\n🔎 Found a similar past query (similarity {sim:.2f}):", fg='yellow')
+        echo(f"  {q}", fg='yellow')
+        echo(f"\n📄 Summary:\n", fg='green')
+        echo(format_summary(items))
+        return
+    echo("\n🌐 Searching the web...", fg='cyan')
+    error, items = answer_query(query, embedding, debug=debug, echo=echo)
+    if error:
+        echo(f"❌ {error}", fg='red')
+        return
+    echo(f"\n📄 Summary:\n", fg='green')
+    echo(format_summary(items))
+
+def _ask_daemon(query, debug, socket_path=SOCKET_PATH):
+    # Returns False when no daemon is listening so the caller can run the query in-process
+    if not hasattr(socket, 'AF_UNIX') or not os.path.exists(socket_path):
+        return False
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        return False
+    with sock, sock.makefile('rwb') as stream:
+        stream.write((json.dumps({'query': query, 'debug': debug}) + '\n').encode('utf-8'))
+        stream.flush()
+        for line in stream:
+            message = json.loads(line)
+            click.secho(message['message'], fg=message.get('fg'))
+    return True
+
 @cli.command()
 @click.argument('query')
 @click.option('--debug', is_flag=True, help='Show debug output')
-def ask(query, debug):
+@click.option('--local', is_flag=True, help='Run in this process even if a daemon is running')
+def ask(query, debug, local):
     """Ask a question to the web query agent."""
-    click.secho(f"\n🕵️  Query: {query}", fg='cyan')
-    if not is_valid_query(query):
-        click.secho("❌ This is not a valid query. Please enter a web search question.", fg='red')
+    if not local and _ask_daemon(query, debug):
         return
-    embedding = get_embedding(query)
-    similar = get_similar(query, embedding)
-    if similar:
-        q, summary, sim = similar
-        click.secho(f"\n🔎 Found a similar past query (similarity {sim:.2f}):", fg='yellow')
-        click.secho(f"  {q}", fg='yellow')
-        click.secho(f"\n📄 Summary:\n", fg='green')
-        click.echo(summary)
+    run_query(query, debug=debug)
+
+def cluster_queries(embeddings, threshold=0.8):
+    """
+    Greedily groups near-duplicate queries: each query joins the first earlier cluster leader
+    it matches at or above the threshold, otherwise it leads a new cluster. Returns a list of
+    (leader_index, [member_indices]) in input order, the leader included among its members.
+    """
+    clusters = []
+    # Every query may lead a cluster; the first len(clusters) rows hold the leaders found so far
+    leaders = np.empty_like(embeddings)
+    for i, vec in enumerate(embeddings):
+        if clusters:
+            sims = leaders[:len(clusters)] @ vec
+            best = int(np.argmax(sims))
+            if sims[best] >= threshold:
+                clusters[best][1].append(i)
+                continue
+        leaders[len(clusters)] = vec
+        clusters.append((i, [i]))
+    return clusters
+
+@cli.command('ask-batch')
+@click.argument('queries', type=click.File('r', encoding='utf-8'), default='-')
+@click.option('--out', type=click.File('a', encoding='utf-8'), default='-',
+              help='JSONL output file, appended to so a resumed run keeps earlier answers (default: stdout)')
+@click.option('--workers', default=4, show_default=True, help='Clusters scraped and summarized in parallel')
+@click.option('--threshold', default=0.8, show_default=True, help='Similarity at which queries count as duplicates')
+@click.option('--debug', is_flag=True, help='Show debug output')
+def ask_batch(queries, out, workers, threshold, debug):
+    """
+    Answer many queries (one per line, from a file or stdin) in one process.
+
+    Queries are embedded in one batch and grouped into near-duplicate clusters, and each
+    cluster's first query runs the pipeline once. Queries already answered in results.db are
+    skipped, so an interrupted run can simply be restarted. One JSON line is written per query
+    as soon as its answer is known.
+    """
+    # out is already open, so redirecting stdout keeps pipeline debug prints out of the JSONL
+    with contextlib.redirect_stdout(sys.stderr):
+        _ask_batch(queries, out, workers, threshold, debug)
+
+def _ask_batch(queries, out, workers, threshold, debug):
+    def emit(record):
+        out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        out.flush()
+
+    seen = set()
+    pending = []
+    for line in queries:
+        query = line.strip()
+        if not query or normalize_query(query) in seen:
+            continue
+        seen.add(normalize_query(query))
+        if is_valid_query(query):
+            pending.append(query)
+        else:
+            emit({'query': query, 'status': 'invalid'})
+    if not pending:
+        return
+    click.secho(f"🧮 Embedding {len(pending)} queries...", fg='cyan', err=True)
+    embeddings = get_embeddings(pending)
+
+    todo = []
+    for query, embedding in zip(pending, embeddings):
+        similar = get_similar_items(embedding, threshold=threshold)
+        if similar:
+            emit({'query': query, 'status': 'cached', 'matched_query': similar[0], 'similarity': round(similar[2], 4),
+                  'items': similar[1]})
+        else:
+            todo.append(query)
+    if not todo:
+        click.secho("✅ All queries are already answered.", fg='green', err=True)
         return
-    click.secho("\n🌐 Searching the web...", fg='cyan')
-    results = search_and_scrape(query, debug=debug)
-    if not results:
-        click.secho("❌ No web results found. Please try a different query.", fg='red')
+    index = {query: i for i, query in enumerate(pending)}
+    todo_embeddings = embeddings[[index[q] for q in todo]]
+    clusters = cluster_queries(todo_embeddings, threshold)
+    click.secho(f"🌐 Answering {len(todo)} new queries as {len(clusters)} clusters "
+                f"({len(pending) - len(todo)} already answered)...", fg='cyan', err=True)
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ask-batch') as pool:
+        futures = {pool.submit(answer_query, todo[leader], todo_embeddings[leader], debug): (leader, members)
+                   for leader, members in clusters}
+        for future in as_completed(futures):
+            leader, members = futures[future]
+            try:
+                error, items = future.result()
+            except Exception as e:
+                error, items = str(e), None
+            for i in members:
+                record = {'query': todo[i], 'answered_by': todo[leader]}
+                if error:
+                    record.update(status='error', error=error)
+                else:
+                    record.update(status='ok', items=items)
+                emit(record)
+            done += 1
+            if debug:
+                click.secho(f"[{done}/{len(clusters)}] {todo[leader]}: {error or 'ok'}", fg='magenta', err=True)
+    click.secho(f"✅ Answered {len(clusters)} clusters.", fg='green', err=True)
+
+@cli.command('compact')
+def compact_db():
+    """Evict stale and least recently used answers from results.db and reclaim space."""
+    evicted = compact()
+    click.secho(f"✅ Evicted {evicted} stored answers.", fg='green')
+
+class _AskHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        request = json.loads(self.rfile.readline())
+        def echo(message='', fg=None):
+            self.wfile.write((json.dumps({'message': message, 'fg': fg}) + '\n').encode('utf-8'))
+            self.wfile.flush()
+        try:
+            run_query(request['query'], debug=request.get('debug', False), echo=echo)
+        except Exception as e:
+            echo(f"❌ Error while answering query: {e}", fg='red')
+
+@cli.command()
+@click.option('--socket', 'socket_path', default=SOCKET_PATH, show_default=True, help='Unix socket to listen on')
+def serve(socket_path):
+    """Run a resident daemon that keeps models, DB and browser warm for `ask`."""
+    if _daemon_running(socket_path):
+        click.secho(f"❌ A daemon is already listening on {socket_path}", fg='red')
         return
-    if debug:
-        click.secho(f"Scraped {len(results)} results:", fg='magenta')
-        for url, text in results:
-            click.secho(f"URL: {url} (text length: {len(text)})", fg='magenta')
-    click.secho("\n📝 Summarizing results...", fg='cyan')
-    summary = summarize_texts(results, debug=debug)
-    if not summary.strip():
-        click.secho("❌ Summary could not be generated. The web pages may have had little or no readable content.", fg='red')
-    else:
-        click.secho(f"\n📄 Summary:\n", fg='green')
-        click.echo(summary)
-    save_result(query, embedding, summary)
+    click.secho("🔥 Warming up models, database and browser...", fg='cyan')
+    if not inference.INFERENCE_SOCKET:
+        get_model()
+        get_summarizer()
+    get_index()
+    try:
+        get_browser_pool().run(lambda page: None)
+    except Exception as e:
+        click.secho(f"⚠️  Browser warm-up failed, will retry on first query: {e}", fg='yellow')
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = socketserver.ThreadingUnixStreamServer(socket_path, _AskHandler)
+    server.daemon_threads = True
+    click.secho(f"✅ Listening on {socket_path}", fg='green')
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        shutdown_browser_pool()
+
+@cli.command('serve-models')
+@click.option('--socket', 'socket_path', default=inference.INFERENCE_SOCKET or INFERENCE_SOCKET_PATH, show_default=True,
+              help='Unix socket to listen on')
+@click.option('--max-batch', default=inference.MAX_BATCH, show_default=True, help='Inputs per model call')
+@click.option('--max-wait-ms', default=inference.MAX_WAIT_MS, show_default=True,
+              help='How long a batch waits for more inputs')
+def serve_models(socket_path, max_batch, max_wait_ms):
+    """Run the shared inference server that micro-batches model calls from all workers."""
+    click.secho("🔥 Loading models...", fg='cyan')
+    signal.signal(signal.SIGTERM, _raise_interrupt)
+    try:
+        inference.serve(socket_path, max_batch, max_wait_ms, ready=lambda: click.secho(
+            f"✅ Listening on {socket_path}; set RIPPLICA_INFERENCE_SOCKET={socket_path} for workers", fg='green'))
+    except KeyboardInterrupt:
+        pass
+
+def _raise_interrupt(signum, frame):
+    # Treat SIGTERM like Ctrl-C so the socket and browsers are cleaned up
+    raise KeyboardInterrupt
+
+def _daemon_running(socket_path):
+    if not os.path.exists(socket_path):
+        return False
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
 
 if __name__ == '__main__':
-    cli() 
\ No newline at end of file
+    cli()
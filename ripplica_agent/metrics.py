@@ -0,0 +1,147 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 2097152)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label value, in the Prometheus exposition model."""
+
+    def __init__(self, name: str, help_text: str, label: str, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value: str, value: float):
+        with self._lock:
+            counts, total = self._series.get(label_value, ([0] * len(self.buckets), [0.0, 0]))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            total[0] += value
+            total[1] += 1
+            self._series[label_value] = (counts, total)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for value, (counts, (total, count)) in sorted(self._series.items()):
+                for bound, n in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{{{self.label}="{value}",le="{bound}"}} {n}')
+                lines.append(f'{self.name}_bucket{{{self.label}="{value}",le="+Inf"}} {count}')
+                lines.append(f'{self.name}_sum{{{self.label}="{value}"}} {total}')
+                lines.append(f'{self.name}_count{{{self.label}="{value}"}} {count}')
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by a tuple of label values."""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for label_values, value in sorted(self.values().items()):
+            labels = ','.join(f'{k}="{v}"' for k, v in zip(self.labels, label_values))
+            lines.append(f'{self.name}{{{labels}}} {value}')
+        return lines
+
+
+STAGE_SECONDS = Histogram('ripplica_stage_seconds', 'Latency of each pipeline stage.', 'stage', LATENCY_BUCKETS)
+FETCH_BYTES = Histogram('ripplica_fetch_bytes', 'Response body bytes read per fetched URL.', 'host', BYTES_BUCKETS)
+CACHE_REQUESTS = Counter('ripplica_cache_requests_total', 'Cache lookups by cache and result.', ('cache', 'result'))
+
+
+class Trace:
+    """Per-query record of stage timings and fetched bytes, printed by the CLI under --debug."""
+
+    def __init__(self):
+        self.stages = []
+        self.fetches = []
+        self._lock = threading.Lock()
+
+    def add_stage(self, name: str, seconds: float):
+        with self._lock:
+            self.stages.append((name, seconds))
+
+    def add_fetch(self, url: str, size: int):
+        with self._lock:
+            self.fetches.append((url, size))
+
+    def format(self) -> str:
+        lines = ["⏱️  Timing breakdown:"]
+        total = sum(seconds for _, seconds in self.stages)
+        for name, seconds in self.stages:
+            lines.append(f"  {name:<12}{seconds * 1000:>10.1f} ms")
+        lines.append(f"  {'total':<12}{total * 1000:>10.1f} ms")
+        for url, size in self.fetches:
+            lines.append(f"  fetched {size:>9,} bytes  {url}")
+        return '\n'.join(lines)
+
+
+_current_trace = contextvars.ContextVar('ripplica_trace', default=None)
+
+def start_trace() -> Trace:
+    """Starts collecting stage timings for the current query (thread/context-local)."""
+    trace = Trace()
+    _current_trace.set(trace)
+    return trace
+
+@contextmanager
+def stage(name: str):
+    """Times the enclosed block as pipeline stage `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+def record_stage(name: str, seconds: float):
+    """Records a stage duration measured by the caller."""
+    STAGE_SECONDS.observe(name, seconds)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_stage(name, seconds)
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache, 'hit' if hit else 'miss')
+
+def record_fetch(url: str, size: int):
+    FETCH_BYTES.observe(urlsplit(url).netloc.lower(), size)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_fetch(url, size)
+
+def render() -> str:
+    """Returns all metrics in the Prometheus text exposition format."""
+    lines = STAGE_SECONDS.render() + FETCH_BYTES.render() + CACHE_REQUESTS.render()
+    lines += ['# HELP ripplica_cache_hit_ratio Share of cache lookups that were hits.',
+              '# TYPE ripplica_cache_hit_ratio gauge']
+    totals = {}
+    for (cache, result), value in CACHE_REQUESTS.values().items():
+        hits, count = totals.get(cache, (0, 0))
+        totals[cache] = (hits + (value if result == 'hit' else 0), count + value)
+    for cache, (hits, count) in sorted(totals.items()):
+        lines.append(f'ripplica_cache_hit_ratio{{cache="{cache}"}} {hits / count if count else 0}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,65 @@
+import os
+from config import DATA_DIR
+
+ONNX_DIR = os.path.join(DATA_DIR, 'onnx_models')
+
+# How the summarizer and embedder run on CPU:
+#   torch  full-precision PyTorch (the original behaviour)
+#   int8   PyTorch with nn.Linear layers dynamically quantized to int8
+#   onnx   ONNX Runtime via optimum / sentence-transformers' onnx backend
+BACKENDS = ('torch', 'int8', 'onnx')
+MODEL_BACKEND = os.environ.get('RIPPLICA_MODEL_BACKEND', 'torch')
+
+
+def _check(backend: str) -> str:
+    backend = backend or MODEL_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown model backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+    return backend
+
+def _quantize(model):
+    # Dynamic quantization: int8 weights, activations quantized on the fly; only Linear layers change
+    import torch
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def load_summarizer(model_name: str, backend: str = None):
+    """
+    Returns a transformers summarization pipeline for model_name running on the given backend
+    (default MODEL_BACKEND). All backends expose the same pipeline and tokenizer interface.
+    """
+    backend = _check(backend)
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, pipeline
+    if backend == 'torch':
+        return pipeline('summarization', model=model_name)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if backend == 'int8':
+        model = _quantize(AutoModelForSeq2SeqLM.from_pretrained(model_name).eval())
+    else:
+        try:
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        except ImportError:
+            raise ImportError("The 'onnx' backend needs optimum with ONNX Runtime: pip install 'optimum[onnxruntime]'")
+        # Export once and reuse the exported graphs on later loads
+        path = os.path.join(ONNX_DIR, model_name.replace('/', '--'))
+        if os.path.isdir(path):
+            model = ORTModelForSeq2SeqLM.from_pretrained(path)
+        else:
+            model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True)
+            model.save_pretrained(path)
+    return pipeline('summarization', model=model, tokenizer=tokenizer)
+
+def load_embedder(model_name: str, backend: str = None):
+    """
+    Returns a SentenceTransformer for model_name running on the given backend (default MODEL_BACKEND).
+    """
+    backend = _check(backend)
+    from sentence_transformers import SentenceTransformer
+    if backend == 'torch':
+        return SentenceTransformer(model_name)
+    if backend == 'int8':
+        return _quantize(SentenceTransformer(model_name, device='cpu').eval())
+    try:
+        return SentenceTransformer(model_name, backend='onnx')
+    except TypeError:
+        raise ImportError("The 'onnx' backend needs sentence-transformers>=3.2 with ONNX Runtime: "
+                          "pip install 'sentence-transformers[onnx]'")
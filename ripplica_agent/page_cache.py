@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from config import DATA_DIR
+from db_pool import ConnectionPool
+
+PAGE_CACHE_DB_PATH = os.path.join(DATA_DIR, 'page_cache.db')
+PAGE_CACHE_TTL = 3600                       # Seconds a cached page is served without revalidation
+PAGE_CACHE_MAX_BYTES = 256 * 1024 * 1024    # Compressed size cap before LRU eviction
+PAGE_CACHE_POOL_SIZE = 8                    # Persistent connections shared by the fetch threads
+ACCESS_FLUSH_BATCH = 1024                   # Pending last_access updates that force a write outside store()
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical cache key for a URL: lowercased scheme/host, no default port, fragment or
+    utm_* tracking parameters, and sorted query parameters.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{parts.port}'
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not k.lower().startswith('utm_'))
+    return urlunsplit((scheme, host, parts.path or '/', urlencode(query), ''))
+
+
+class PageCache:
+    """
+    On-disk cache of extracted (title, text) pages keyed by normalized URL.
+
+    Text is stored zlib-compressed together with the response's ETag/Last-Modified validators,
+    so an expired entry can be revalidated with a conditional GET. The table is kept under
+    max_bytes by evicting the least recently used entries.
+    """
+
+    def __init__(self, db_path: str = PAGE_CACHE_DB_PATH, ttl: float = PAGE_CACHE_TTL,
+                 max_bytes: int = PAGE_CACHE_MAX_BYTES, pool_size: int = PAGE_CACHE_POOL_SIZE):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'stored': 0, 'evicted': 0}
+        # Key -> time of its latest lookup; written in batches so a cache hit stays read-only
+        self._accessed = {}
+        self._pool = ConnectionPool(db_path, pool_size)
+        with self._pool.connection() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                title TEXT,
+                text BLOB,
+                etag TEXT,
+                last_modified TEXT,
+                expires_at REAL,
+                last_access REAL,
+                size INTEGER
+            )''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_pages_last_access ON pages (last_access)')
+            # Running size of the table, so store() only sums it when eviction may be due
+            self._total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        """
+        Returns the cached entry for url as a dict with title, text, etag, last_modified and
+        a 'fresh' flag, or None if the URL has never been stored.
+        """
+        key = normalize_url(url)
+        with self._pool.connection() as conn:
+            row = conn.execute('SELECT title, text, etag, last_modified, expires_at FROM pages WHERE url = ?',
+                               (key,)).fetchone()
+        if row is None:
+            return None
+        with self._lock:
+            self._accessed[key] = time.time()
+            flush = len(self._accessed) >= ACCESS_FLUSH_BATCH
+        if flush:
+            with self._pool.connection() as conn:
+                self._flush_accesses(conn)
+        title, text, etag, last_modified, expires_at = row
+        return {'title': title, 'text': zlib.decompress(text).decode('utf-8'), 'etag': etag,
+                'last_modified': last_modified, 'fresh': expires_at > time.time()}
+
+    def conditional_headers(self, entry: Optional[Dict]) -> Dict[str, str]:
+        """Request headers that let the origin answer 304 for an unchanged cached page."""
+        headers = {}
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def touch(self, url: str):
+        """Extends the TTL of an entry the origin confirmed unchanged (304)."""
+        with self._pool.connection() as conn:
+            conn.execute('UPDATE pages SET expires_at = ? WHERE url = ?', (time.time() + self.ttl, normalize_url(url)))
+        self.record('revalidated')
+
+    def store(self, url: str, title: str, text: str, etag: str = None, last_modified: str = None):
+        key = normalize_url(url)
+        blob = zlib.compress(text.encode('utf-8'))
+        now = time.time()
+        with self._pool.connection() as conn:
+            # Flush recorded hits first so eviction sees the true least recently used pages
+            self._flush_accesses(conn)
+            old = conn.execute('SELECT size FROM pages WHERE url = ?', (key,)).fetchone()
+            conn.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                         (key, title, blob, etag, last_modified, now + self.ttl, now, len(blob)))
+            with self._lock:
+                self._total += len(blob) - (old[0] if old else 0)
+                over = self._total > self.max_bytes
+            evicted = self._evict(conn) if over else 0
+        self.record('stored')
+        if evicted:
+            self.record('evicted', evicted)
+
+    def _flush_accesses(self, conn):
+        with self._lock:
+            accessed, self._accessed = self._accessed, {}
+        conn.executemany('UPDATE pages SET last_access = MAX(last_access, ?) WHERE url = ?',
+                         [(at, key) for key, at in accessed.items()])
+
+    def _evict(self, conn) -> int:
+        # Other processes store and evict too, so recount before deleting anything
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+        evicted = 0
+        while total > self.max_bytes:
+            rows = conn.execute('SELECT url, size FROM pages ORDER BY last_access LIMIT 64').fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                conn.execute('DELETE FROM pages WHERE url = ?', (key,))
+                total -= size
+                evicted += 1
+        with self._lock:
+            self._total = total
+        return evicted
+
+    def record(self, counter: str, amount: int = 1):
+        with self._lock:
+            self._stats[counter] += amount
+
+    def stats(self) -> Dict[str, int]:
+        """Returns a snapshot of the hit/miss/revalidation/eviction counters."""
+        with self._lock:
+            return dict(self._stats)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_page_cache() -> PageCache:
+    """
+    Returns the process-wide page cache, creating it on first use.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PageCache()
+        return _cache
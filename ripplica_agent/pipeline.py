@@ -0,0 +1,37 @@
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+from search_scraper import search_and_scrape
+from summarizer import summarize_results, format_summary
+from storage import save_result
+from metrics import stage
+
+NO_RESULTS = "No web results found. Please try a different query."
+NO_SUMMARY = "Summary could not be generated. The web pages may have had little or no readable content."
+
+
+def _quiet(message='', fg=None):
+    pass
+
+def answer_query(query: str, embedding: np.ndarray, debug: bool = False,
+                 echo: Callable = _quiet) -> Tuple[Optional[str], Optional[List[dict]]]:
+    """
+    Searches, summarizes and saves a query that missed the cache. Returns (error, items): the
+    NO_RESULTS or NO_SUMMARY message and None, or None and the per-result items.
+    Progress is reported through echo(message, fg=None), like run_query.
+    """
+    results = search_and_scrape(query, debug=debug)
+    if not results:
+        return NO_RESULTS, None
+    if debug:
+        echo(f"Scraped {len(results)} results:", fg='magenta')
+        for url, title, text in results:
+            echo(f"URL: {url} (text length: {len(text)})", fg='magenta')
+    echo("\n📝 Summarizing results...", fg='cyan')
+    with stage('summarize'):
+        items = summarize_results(results, debug=debug)
+    summary = format_summary(items)
+    if not summary.strip():
+        return NO_SUMMARY, None
+    with stage('save'):
+        save_result(query, embedding, summary, items)
+    return None, items
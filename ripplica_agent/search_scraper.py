@@ -1,7 +1,37 @@
 import asyncio
-from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
+import contextvars
+import importlib.util
+from bs4 import BeautifulSoup, NavigableString
 import requests
+from requests.adapters import HTTPAdapter
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+from urllib.parse import urlsplit
+from browser_pool import get_browser_pool
+from page_cache import get_page_cache
+from metrics import record_cache, record_fetch, record_stage, stage
+
+MAX_FETCH_WORKERS = 16     # Concurrent page fetches across all queries
+PER_HOST_LIMIT = 2         # Concurrent fetches against any single host
+FETCH_TIMEOUT = 10         # Per-request timeout in seconds
+SCRAPE_DEADLINE = 12       # Overall budget for one scrape_urls batch in seconds
+SEARCH_URL = 'https://duckduckgo.com/?q={query}&t=h_&ia=web'
+FALLBACK_SEARCH_URL = 'https://www.google.com/search?q={query}'
+MAX_PAGE_BYTES = 2 * 1024 * 1024   # Bytes read from a response body before the download is cut off
+MAX_TEXT_CHARS = 5000              # Characters of main content kept per page
+
+# lxml is much faster than the pure-Python parser; fall back when it is not installed
+HAVE_LXML = importlib.util.find_spec('lxml') is not None
+HTML_PARSER = 'lxml' if HAVE_LXML else 'html.parser'
+ACCEPTED_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain')
+_NON_CONTENT_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'head', 'title'}
+
+_executor = ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS, thread_name_prefix='scrape')
+_session = None
+_session_lock = threading.Lock()
+_host_limits = {}
+_host_limits_lock = threading.Lock()
 
 def extract_main_content(soup):
     # Try <article>
@@ -20,62 +50,306 @@ def extract_main_content(soup):
     # Fallback: all text
     return ' '.join(soup.stripped_strings), 'all_text'
 
-def scrape_urls(urls, num_results, debug=False):
-    results = []
-    for url in urls[:num_results]:
+def _join_capped(node, max_chars):
+    # Like ' '.join(node.stripped_strings) but skips non-content tags and stops once max_chars are collected
+    return _join_text((string for string in node.descendants
+                       if type(string) is NavigableString and string.parent.name not in _NON_CONTENT_TAGS),
+                      max_chars)
+
+def extract_main_text(soup, max_chars: int = MAX_TEXT_CHARS):
+    """
+    Single-pass variant of extract_main_content. Text lengths for every element are
+    accumulated bottom-up in one walk over the tree (ignoring scripts, styles and link text),
+    instead of rebuilding get_text() for every nested <div>, and only max_chars of the chosen
+    node's text are collected.
+    """
+    for name in ('article', 'main'):
+        node = soup.find(name)
+        if node:
+            return _join_capped(node, max_chars), name
+    lengths = {}
+    best, best_length = None, 0
+    # Reversed document order visits every node after all of its descendants
+    for node in reversed(list(soup.descendants)):
+        parent = node.parent
+        if isinstance(node, NavigableString):
+            if type(node) is NavigableString and parent is not None:
+                lengths[id(parent)] = lengths.get(id(parent), 0) + len(node.strip())
+            continue
+        length = lengths.pop(id(node), 0)
+        if node.name == 'div' and length >= best_length and length:
+            best, best_length = node, length
+        if node.name in _NON_CONTENT_TAGS or node.name == 'a':
+            length = 0
+        if parent is not None and length:
+            lengths[id(parent)] = lengths.get(id(parent), 0) + length
+    if best is not None:
+        return _join_capped(best, max_chars), 'largest_div'
+    return _join_capped(soup, max_chars), 'all_text'
+
+def _extract_with_lxml(markup, max_chars):
+    # Same selection as extract_main_text, run directly on an lxml tree (no BeautifulSoup objects)
+    import lxml.html
+    from lxml import etree
+    doc = lxml.html.document_fromstring(markup)
+    title_el = doc.find('.//title')
+    title = title_el.text_content().strip() if title_el is not None else ''
+    for el in list(doc.iter(etree.Comment, *_NON_CONTENT_TAGS)):
+        if el.getparent() is not None:
+            el.drop_tree()
+    for name in ('article', 'main'):
+        node = doc.find(f'.//{name}')
+        if node is not None:
+            return title, _join_text(node.itertext(), max_chars), name
+    lengths = {}
+    best, best_length = None, 0
+    for el in reversed(list(doc.iter())):
+        length = lengths.pop(el, 0) + (len(el.text.strip()) if el.text else 0)
+        if el.tag == 'div' and length and length >= best_length:
+            best, best_length = el, length
+        if el.tag == 'a':
+            length = 0
+        parent = el.getparent()
+        if parent is not None:
+            length += len(el.tail.strip()) if el.tail else 0
+            if length:
+                lengths[parent] = lengths.get(parent, 0) + length
+    if best is not None:
+        return title, _join_text(best.itertext(), max_chars), 'largest_div'
+    return title, _join_text(doc.itertext(), max_chars), 'all_text'
+
+def _join_text(strings, max_chars):
+    parts, used = [], 0
+    for string in strings:
+        text = string.strip()
+        if not text:
+            continue
+        parts.append(text)
+        used += len(text) + 1
+        if used >= max_chars:
+            break
+    return ' '.join(parts)[:max_chars].rstrip()
+
+def parse_page(markup, max_chars: int = MAX_TEXT_CHARS):
+    """
+    Parses an HTML document and returns (title, main_text, method). Uses lxml directly when
+    it is installed and BeautifulSoup with extract_main_text otherwise.
+    """
+    if HAVE_LXML:
         try:
-            resp = requests.get(url, timeout=10)
-            soup = BeautifulSoup(resp.text, 'html.parser')
-            title = soup.title.string.strip() if soup.title and soup.title.string else url
-            text, used = extract_main_content(soup)
+            return _extract_with_lxml(markup, max_chars)
+        except Exception:
+            # lxml rejects some inputs (e.g. empty documents); let BeautifulSoup try
+            pass
+    soup = BeautifulSoup(markup, HTML_PARSER)
+    title = soup.title.string.strip() if soup.title and soup.title.string else ''
+    text, used = extract_main_text(soup, max_chars)
+    return title, text, used
+
+def read_capped(resp, max_bytes: int = MAX_PAGE_BYTES, deadline: float = None):
+    """
+    Reads a streamed response body up to max_bytes. Returns text when the response declares
+    a charset, otherwise raw bytes so the HTML parser can sniff the encoding from <meta>.
+    Raises TimeoutError once time.monotonic() passes deadline, so a server trickling bytes
+    can't hold a fetch past its budget.
+    """
+    chunks, size = [], 0
+    for chunk in _body_chunks(resp):
+        if deadline is not None and time.monotonic() > deadline:
+            raise TimeoutError(f"body not received within {FETCH_TIMEOUT}s")
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= max_bytes:
+            break
+    body = b''.join(chunks)[:max_bytes]
+    record_fetch(resp.url, len(body))
+    if 'charset=' in resp.headers.get('Content-Type', '').lower():
+        return body.decode(resp.encoding, errors='replace')
+    return body
+
+def _body_chunks(resp):
+    # urllib3 2.2+ read1 returns whatever has arrived instead of waiting for a full chunk, so
+    # read_capped checks its deadline after every socket read. Older urllib3 (which requests
+    # still allows) only reads whole chunks; smaller ones keep the check reasonably frequent
+    if hasattr(resp.raw, 'read1'):
+        while True:
+            chunk = resp.raw.read1(64 * 1024, decode_content=True)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        yield from resp.raw.stream(4 * 1024, decode_content=True)
+
+def get_session() -> requests.Session:
+    """
+    Returns the shared keep-alive session used for page fetches.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=MAX_FETCH_WORKERS, pool_maxsize=MAX_FETCH_WORKERS)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+def _host_limit(url):
+    host = urlsplit(url).netloc.lower()
+    with _host_limits_lock:
+        if host not in _host_limits:
+            _host_limits[host] = threading.BoundedSemaphore(PER_HOST_LIMIT)
+        return _host_limits[host]
+
+def fetch_page(url, debug=False):
+    """
+    Fetches and parses a single URL, returning a (url, title, text) tuple.
+    Fresh pages come from the page cache; stale ones are revalidated with a conditional GET.
+    """
+    try:
+        cache = get_page_cache()
+        cached = cache.lookup(url)
+        if cached and cached['fresh']:
+            cache.record('hits')
+            record_cache('page', True)
             if debug:
-                print(f"[DEBUG] Used {used} for {url}, text length: {len(text)}")
-            results.append((url, title, text[:5000]))  # Limit to 5000 chars
-        except Exception as e:
+                print(f"[DEBUG] Page cache hit for {url}")
+            return (url, cached['title'], cached['text'])
+        with _host_limit(url):
+            # FETCH_TIMEOUT bounds each socket wait; the deadline bounds the whole download
+            deadline = time.monotonic() + FETCH_TIMEOUT
+            resp = get_session().get(url, timeout=FETCH_TIMEOUT, headers=cache.conditional_headers(cached), stream=True)
+            try:
+                if resp.status_code == 304 and cached:
+                    cache.touch(url)
+                    record_cache('page', True)
+                    if debug:
+                        print(f"[DEBUG] Page unchanged (304) for {url}")
+                    return (url, cached['title'], cached['text'])
+                content_type = resp.headers.get('Content-Type', '').split(';')[0].strip().lower()
+                if content_type and content_type not in ACCEPTED_CONTENT_TYPES:
+                    raise ValueError(f"unsupported content type {content_type}")
+                body = read_capped(resp, deadline=deadline)
+            finally:
+                resp.close()
+        cache.record('misses')
+        record_cache('page', False)
+        title, text, used = parse_page(body)
+        title = title or url
+        if debug:
+            print(f"[DEBUG] Used {used} for {url}, text length: {len(text)}")
+        if resp.status_code == 200:
+            cache.store(url, title, text, resp.headers.get('ETag'), resp.headers.get('Last-Modified'))
+        return (url, title, text)
+    except Exception as e:
+        if debug:
+            print(f"[DEBUG] Error scraping {url}: {e}")
+        return (url, url, f'Error scraping: {e}')
+
+def iter_scrape_urls(urls, num_results, debug=False, deadline=SCRAPE_DEADLINE):
+    """
+    Fetches the first num_results URLs concurrently and yields (rank, (url, title, text)) pairs
+    in completion order, so callers can start on the fastest page while the rest load.
+    Pages still loading when the deadline expires are yielded last as errors.
+    """
+    urls = urls[:num_results]
+    start = time.perf_counter()
+    finished_at = []
+    # Each fetch runs in a copy of the caller's context so it reports into the caller's trace
+    futures = {}
+    for rank, url in enumerate(urls):
+        future = _executor.submit(contextvars.copy_context().run, fetch_page, url, debug)
+        future.add_done_callback(lambda f: finished_at.append(time.perf_counter()))
+        futures[future] = rank
+    pending = set(futures)
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            pending.discard(future)
+            yield futures[future], future.result()
+    except FuturesTimeoutError:
+        # A slow consumer can outlast the deadline; pages that did finish are still returned
+        for future in sorted(pending, key=futures.get):
+            rank = futures[future]
+            if future.done():
+                yield rank, future.result()
+                continue
             if debug:
-                print(f"[DEBUG] Error scraping {url}: {e}")
-            results.append((url, url, f'Error scraping: {e}'))
-    return results
+                print(f"[DEBUG] Deadline reached before {urls[rank]} finished")
+            yield rank, (urls[rank], urls[rank], f'Error scraping: no response within {deadline}s')
+    end = max(finished_at) if urls and len(finished_at) == len(urls) else time.perf_counter()
+    record_stage('scrape', end - start)
+
+def scrape_urls(urls, num_results, debug=False, deadline=SCRAPE_DEADLINE):
+    """
+    Fetches the first num_results URLs concurrently and returns (url, title, text) tuples in rank order.
+    Pages still loading when the deadline expires are reported as errors so the batch never waits on them.
+    """
+    results = dict(iter_scrape_urls(urls, num_results, debug=debug, deadline=deadline))
+    return [results[rank] for rank in sorted(results)]
+
+def find_result_urls(page, query: str, debug: bool = False):
+    """
+    Searches DuckDuckGo for the query on the given Playwright page and returns the result URLs.
+    Falls back to Google if DuckDuckGo fails.
+    """
+    # Try DuckDuckGo
+    page.goto(SEARCH_URL.format(query=query.replace(" ", "+")))
+    try:
+        page.wait_for_selector('a[data-testid="result-title-a"], a.result__a', timeout=10000)
+        links = page.query_selector_all('a[data-testid="result-title-a"], a.result__a')
+        urls = [a.get_attribute('href') for a in links]
+        urls = [u for u in urls if u and u.startswith('http')]
+        if urls:
+            return urls
+    except Exception as e:
+        if debug:
+            print(f"[DEBUG] DuckDuckGo search failed: {e}")
+    # Fallback to Google
+    if debug:
+        print("[DEBUG] Falling back to Google search...")
+    page.goto(FALLBACK_SEARCH_URL.format(query=query.replace(" ", "+")))
+    try:
+        page.wait_for_selector('a h3', timeout=10000)
+        links = page.query_selector_all('a h3')
+        urls = []
+        for h3 in links:
+            a = h3.evaluate_handle('node => node.parentElement')
+            href = a.get_property('href').json_value()
+            if href and href.startswith('http') and 'google.com' not in href:
+                urls.append(href)
+        return urls
+    except Exception as e:
+        if debug:
+            print(f"[DEBUG] Google search failed: {e}")
+    return []
 
 def search_and_scrape(query: str, num_results: int = 5, debug: bool = False):
     """
     Searches DuckDuckGo for the query, scrapes the top result URLs, and returns a list of (url, title, text) tuples.
-    Falls back to Google if DuckDuckGo fails.
+    Falls back to Google if DuckDuckGo fails. The search runs on a page leased from the shared browser pool.
     """
-    with sync_playwright() as p:
-        browser = p.firefox.launch(headless=True)
-        page = browser.new_page()
-        # Try DuckDuckGo
-        page.goto(f'https://duckduckgo.com/?q={query.replace(" ", "+")}&t=h_&ia=web')
-        try:
-            page.wait_for_selector('a[data-testid="result-title-a"], a.result__a', timeout=10000)
-            links = page.query_selector_all('a[data-testid="result-title-a"], a.result__a')
-            urls = [a.get_attribute('href') for a in links]
-            urls = [u for u in urls if u and u.startswith('http')]
-            if urls:
-                browser.close()
-                return scrape_urls(urls, num_results, debug=debug)
-        except Exception as e:
-            if debug:
-                print(f"[DEBUG] DuckDuckGo search failed: {e}")
-        # Fallback to Google
+    try:
+        with stage('search'):
+            urls = get_browser_pool().run(lambda page: find_result_urls(page, query, debug=debug))
+    except Exception as e:
         if debug:
-            print("[DEBUG] Falling back to Google search...")
-        page.goto(f'https://www.google.com/search?q={query.replace(" ", "+")}')
-        try:
-            page.wait_for_selector('a h3', timeout=10000)
-            links = page.query_selector_all('a h3')
-            urls = []
-            for h3 in links:
-                a = h3.evaluate_handle('node => node.parentElement')
-                href = a.get_property('href').json_value()
-                if href and href.startswith('http') and 'google.com' not in href:
-                    urls.append(href)
-            if urls:
-                browser.close()
-                return scrape_urls(urls, num_results, debug=debug)
-        except Exception as e:
-            if debug:
-                print(f"[DEBUG] Google search failed: {e}")
-        browser.close()
-    return [] 
\ No newline at end of file
+            print(f"[DEBUG] Browser search failed: {e}")
+        return []
+    if not urls:
+        return []
+    return scrape_urls(urls, num_results, debug=debug)
+
+def iter_search_and_scrape(query: str, num_results: int = 5, debug: bool = False):
+    """
+    Pipelined variant of search_and_scrape: yields (rank, (url, title, text)) pairs as each page
+    finishes loading, fastest first. Yields nothing if the search finds no results.
+    """
+    try:
+        with stage('search'):
+            urls = get_browser_pool().run(lambda page: find_result_urls(page, query, debug=debug))
+    except Exception as e:
+        if debug:
+            print(f"[DEBUG] Browser search failed: {e}")
+        return
+    if urls:
+        yield from iter_scrape_urls(urls, num_results, debug=debug)
@@ -1,42 +1,279 @@
-import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
 import numpy as np
 import os
-from embeddings import get_embedding, cosine_similarity
+from config import DATA_DIR
+from db_pool import ConnectionPool
+from vector_index import EmbeddingIndex
 
-DB_PATH = os.path.join(os.path.dirname(__file__), 'results.db')
+DB_PATH = os.path.join(DATA_DIR, 'results.db')
+
+# Switch the similarity index to IVF (approximate) search for very large histories
+APPROXIMATE_INDEX = False
+
+POOL_SIZE = 8                   # Persistent connections shared by all threads
+RESULT_TTL = 30 * 24 * 3600     # Seconds a stored answer is served before it is considered stale; None keeps them forever
+MAX_RESULTS = 100000            # Stored answers kept; the least recently hit beyond this are evicted
+COMPACTION_INTERVAL = 600       # Seconds between background eviction/compaction passes
+VACUUM_FREE_RATIO = 0.25        # Rebuild the file once this share of its pages is free
+STALE_SLACK = 4                 # Extra index candidates per lookup to look past expired rows awaiting compaction
+
+_pool = ConnectionPool(DB_PATH, POOL_SIZE)
+
+def get_pool() -> ConnectionPool:
+    return _pool
 
 # Ensure table exists
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    with _pool.connection() as conn:
+        # Take the write lock before reading user_version so processes starting together
+        # (e.g. several web workers) migrate one after another instead of racing on ALTER TABLE
+        conn.execute('BEGIN IMMEDIATE')
+        _create_schema(conn.cursor())
+
+def _create_schema(c):
     c.execute('''CREATE TABLE IF NOT EXISTS results (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         query TEXT,
         embedding BLOB,
         summary TEXT
     )''')
-    conn.commit()
-    conn.close()
+    # One row per scraped page of a stored query, in search rank order
+    c.execute('''CREATE TABLE IF NOT EXISTS result_items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        result_id INTEGER REFERENCES results(id),
+        rank INTEGER,
+        url TEXT,
+        title TEXT,
+        summary TEXT,
+        duplicate_of TEXT
+    )''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_result_items_result ON result_items (result_id, rank)')
+    version = c.execute('PRAGMA user_version').fetchone()[0]
+    if version < 1:
+        _migrate_legacy_summaries(c)
+    if version < 2:
+        # Rows stored before timestamps existed count as created now; last_hit_at NULL means never hit
+        _add_column(c, 'results', 'created_at', 'REAL')
+        _add_column(c, 'results', 'last_hit_at', 'REAL')
+        c.execute('UPDATE results SET created_at = ? WHERE created_at IS NULL', (time.time(),))
+        c.execute('CREATE INDEX IF NOT EXISTS idx_results_created ON results (created_at)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_results_recency ON results (COALESCE(last_hit_at, created_at))')
+        c.execute('PRAGMA user_version = 2')
+    if version < 3:
+        # URL of the earlier result whose content a near-duplicate page shares
+        _add_column(c, 'result_items', 'duplicate_of', 'TEXT')
+        c.execute('PRAGMA user_version = 3')
+
+def _add_column(c, table: str, column: str, decl: str):
+    # Idempotent ALTER TABLE: result_items is created with duplicate_of, and a crashed migration may be re-run
+    if column not in {row[1] for row in c.execute(f'PRAGMA table_info({table})')}:
+        c.execute(f'ALTER TABLE {table} ADD COLUMN {column} {decl}')
+
+def _parse_legacy_summary(summary: str):
+    # Rows saved before result_items existed only have the combined markdown summary
+    items = []
+    for line in ('\n' + (summary or '')).split('\n- ')[1:]:
+        if line.strip():
+            parts = line.strip().split('\n', 1)
+            title_url = parts[0]
+            summ = parts[1] if len(parts) > 1 else ''
+            if title_url.startswith('[') and '](' in title_url:
+                title = title_url.split('](')[0][1:]
+                url = title_url.split('](')[1][:-1]
+            else:
+                title = url = title_url
+            items.append({'title': title, 'url': url, 'summary': summ.strip()})
+    return items
+
+def _migrate_legacy_summaries(c):
+    rows = c.execute('''SELECT id, summary FROM results
+                        WHERE id NOT IN (SELECT DISTINCT result_id FROM result_items)''').fetchall()
+    for row_id, summary in rows:
+        _insert_items(c, row_id, _parse_legacy_summary(summary))
+
+def _insert_items(c, result_id: int, items):
+    c.executemany('''INSERT INTO result_items (result_id, rank, url, title, summary, duplicate_of)
+                     VALUES (?, ?, ?, ?, ?, ?)''',
+                  [(result_id, rank, item['url'], item['title'], item['summary'], item.get('duplicate_of'))
+                   for rank, item in enumerate(items)])
 
 init_db()
 
-def save_result(query: str, embedding: np.ndarray, summary: str):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('INSERT INTO results (query, embedding, summary) VALUES (?, ?, ?)',
-              (query, embedding.tobytes(), summary))
-    conn.commit()
-    conn.close()
+_index = None
+_index_lock = threading.Lock()
+# Highest results.id the index has caught up with; other processes keep inserting above it
+_loaded_id = 0
+_sync_lock = threading.Lock()
+_compactor = None
+# Row id -> time of its latest cache hit; batched into last_hit_at by compact() so lookups stay read-only
+_hits = {}
+_hits_lock = threading.Lock()
+
+def _fresh_cutoff() -> float:
+    # Rows created before this time are stale
+    return time.time() - RESULT_TTL if RESULT_TTL is not None else 0.0
+
+def get_index() -> EmbeddingIndex:
+    """
+    Returns the resident embedding index, loading every fresh stored vector from the DB on first use.
+    Also starts the background compaction job.
+    """
+    global _index, _loaded_id
+    with _index_lock:
+        if _index is None:
+            index = EmbeddingIndex(approximate=APPROXIMATE_INDEX)
+            with _pool.connection() as conn:
+                rows = conn.execute('SELECT id, embedding FROM results WHERE created_at IS NULL OR created_at >= ?',
+                                    (_fresh_cutoff(),)).fetchall()
+            if rows:
+                _loaded_id = max(row_id for row_id, _ in rows)
+                # Skip rows whose vectors don't match the dominant embedding size
+                size = Counter(len(blob) for _, blob in rows).most_common(1)[0][0]
+                rows = [(row_id, blob) for row_id, blob in rows if len(blob) == size]
+                vectors = np.frombuffer(b''.join(blob for _, blob in rows), dtype=np.float32)
+                index.build([row_id for row_id, _ in rows], vectors.reshape(len(rows), -1))
+            _index = index
+            _start_compactor()
+        return _index
+
+def _sync_index() -> EmbeddingIndex:
+    # ask-batch, the serve daemon and other web workers write to results.db too. AUTOINCREMENT ids
+    # grow in commit order, so everything not yet in the index is above _loaded_id
+    global _loaded_id
+    index = get_index()
+    with _sync_lock:
+        with _pool.connection() as conn:
+            rows = conn.execute('SELECT id, embedding FROM results WHERE id > ? ORDER BY id', (_loaded_id,)).fetchall()
+        for row_id, blob in rows:
+            try:
+                index.add(row_id, np.frombuffer(blob, dtype=np.float32))
+            except ValueError:
+                pass  # Embedding from a different model; skipped like on the initial load
+            _loaded_id = row_id
+    return index
+
+def save_result(query: str, embedding: np.ndarray, summary: str, items=None) -> int:
+    """
+    Stores a query with its combined summary and, optionally, its per-result
+    {'url', 'title', 'summary'} dicts. Returns the new result id.
+    """
+    embedding = np.asarray(embedding, dtype=np.float32)
+    with _pool.connection() as conn:
+        c = conn.cursor()
+        c.execute('INSERT INTO results (query, embedding, summary, created_at) VALUES (?, ?, ?, ?)',
+                  (query, embedding.tobytes(), summary, time.time()))
+        row_id = c.lastrowid
+        _insert_items(c, row_id, items if items is not None else _parse_legacy_summary(summary))
+    # Picks up the new row (and any other process's) without adding it twice
+    _sync_index()
+    return row_id
+
+def get_items(result_id: int):
+    """
+    Returns the stored {'url', 'title', 'summary'} dicts for a result, in rank order, with
+    'duplicate_of' set on near-duplicate pages.
+    """
+    with _pool.connection() as conn:
+        rows = conn.execute('''SELECT url, title, summary, duplicate_of FROM result_items
+                               WHERE result_id = ? ORDER BY rank''', (result_id,)).fetchall()
+    items = []
+    for url, title, summary, duplicate_of in rows:
+        item = {'url': url, 'title': title, 'summary': summary}
+        if duplicate_of:
+            item['duplicate_of'] = duplicate_of
+        items.append(item)
+    return items
+
+def _lookup(embedding: np.ndarray, k: int, threshold: float):
+    # (row_id, query, summary, similarity) for fresh matches, best first. Stale rows are only
+    # skipped here: removing them rebuilds the index, which compact() does in one batch. A few
+    # extra candidates keep a stale best match from hiding a fresh one just below it.
+    hits = [(row_id, sim) for row_id, sim in _sync_index().search(embedding, k + STALE_SLACK) if sim >= threshold]
+    if not hits:
+        return []
+    placeholders = ','.join('?' * len(hits))
+    with _pool.connection() as conn:
+        rows = conn.execute(f'SELECT id, query, summary, created_at FROM results WHERE id IN ({placeholders})',
+                            [row_id for row_id, _ in hits]).fetchall()
+    cutoff = _fresh_cutoff()
+    by_id = {row_id: (q, summary) for row_id, q, summary, created in rows if created is None or created >= cutoff}
+    matches = [(row_id, *by_id[row_id], sim) for row_id, sim in hits if row_id in by_id][:k]
+    now = time.time()
+    with _hits_lock:
+        for row_id, *_ in matches:
+            _hits[row_id] = now
+    return matches
+
+def find_similar(embedding: np.ndarray, k: int = 5, threshold: float = 0.8):
+    """
+    Returns up to k (query, summary, similarity) tuples for fresh stored queries at or above the threshold, best first.
+    """
+    return [(q, summary, sim) for _, q, summary, sim in _lookup(embedding, k, threshold)]
 
 def get_similar(query: str, embedding: np.ndarray, threshold: float = 0.8):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('SELECT query, embedding, summary FROM results')
-    rows = c.fetchall()
-    conn.close()
-    for q, emb_blob, summary in rows:
-        emb = np.frombuffer(emb_blob, dtype=np.float32)
-        sim = cosine_similarity(embedding, emb)
-        if sim >= threshold:
-            return q, summary, sim
-    return None 
\ No newline at end of file
+    matches = find_similar(embedding, k=1, threshold=threshold)
+    return matches[0] if matches else None
+
+def get_similar_items(embedding: np.ndarray, threshold: float = 0.8):
+    """
+    Returns (query, items, similarity) for the most similar fresh stored query at or above the threshold, or None.
+    """
+    matches = _lookup(embedding, 1, threshold)
+    if not matches:
+        return None
+    row_id, q, _, sim = matches[0]
+    return q, get_items(row_id), sim
+
+def compact():
+    """
+    Flushes recorded hit times, evicts answers older than RESULT_TTL and the least recently hit
+    ones beyond MAX_RESULTS, then checkpoints the WAL and vacuums once enough of the file is free.
+    Returns the number of evicted answers.
+    """
+    with _hits_lock:
+        hits = list(_hits.items())
+        _hits.clear()
+    cutoff = _fresh_cutoff()
+    with _pool.connection() as conn:
+        conn.executemany('UPDATE results SET last_hit_at = MAX(COALESCE(last_hit_at, 0), ?) WHERE id = ?',
+                         [(hit_at, row_id) for row_id, hit_at in hits])
+        # Rows written without a timestamp (e.g. by external tools) start aging now
+        conn.execute('UPDATE results SET created_at = ? WHERE created_at IS NULL', (time.time(),))
+        evicted = [row_id for row_id, in conn.execute('SELECT id FROM results WHERE created_at < ?', (cutoff,))]
+        if MAX_RESULTS is not None:
+            excess = conn.execute('SELECT COUNT(*) FROM results WHERE created_at >= ?', (cutoff,)).fetchone()[0] - MAX_RESULTS
+            if excess > 0:
+                evicted += [row_id for row_id, in conn.execute(
+                    '''SELECT id FROM results WHERE created_at >= ?
+                       ORDER BY COALESCE(last_hit_at, created_at) LIMIT ?''', (cutoff, excess))]
+        conn.executemany('DELETE FROM result_items WHERE result_id = ?', [(row_id,) for row_id in evicted])
+        conn.executemany('DELETE FROM results WHERE id = ?', [(row_id,) for row_id in evicted])
+    if evicted and _index is not None:
+        _index.remove(evicted)
+    with _pool.connection() as conn:
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        pages = conn.execute('PRAGMA page_count').fetchone()[0]
+        if pages and free / pages >= VACUUM_FREE_RATIO:
+            conn.execute('VACUUM')
+    return len(evicted)
+
+def _start_compactor():
+    global _compactor
+    if _compactor is None and COMPACTION_INTERVAL:
+        _compactor = threading.Thread(target=_compaction_loop, name='results-compactor', daemon=True)
+        _compactor.start()
+
+def _compaction_loop():
+    # Background thread: report on stderr so nothing lands in a command's stdout (e.g. ask-batch JSONL)
+    while True:
+        time.sleep(COMPACTION_INTERVAL)
+        try:
+            evicted = compact()
+            if evicted:
+                print(f"[DEBUG] Evicted {evicted} stored answers from results.db", file=sys.stderr)
+        except Exception as e:
+            print(f"[DEBUG] results.db compaction failed: {e}", file=sys.stderr)
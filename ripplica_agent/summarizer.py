@@ -1,31 +1,195 @@
-from typing import List, Tuple
-from transformers import pipeline
+import re
+import threading
+from typing import Dict, List, Tuple
+import os
+from summary_cache import cache_key, get_summary_cache
+from metrics import record_cache
+from dedup import find_duplicates
+import inference
+import model_backends
 
-# Load summarization pipeline (bart-large-cnn is good, fallback to t5-small if needed)
-summarizer = pipeline('summarization', model='facebook/bart-large-cnn')
+# bart-large-cnn is good, fallback to t5-small if needed; set RIPPLICA_SUMMARY_MODEL to
+# DISTILLED_MODEL_NAME for a smaller, faster model
+MODEL_NAME = os.environ.get('RIPPLICA_SUMMARY_MODEL', 'facebook/bart-large-cnn')
+DISTILLED_MODEL_NAME = 'sshleifer/distilbart-cnn-12-6'
 
-def summarize_texts(results: List[Tuple[str, str, str]], debug: bool = False) -> str:
+BATCH_SIZE = 8          # Chunks sent through the model per forward pass
+CHUNK_TOKENS = 900      # Token budget per chunk, leaving headroom under BART's 1024 limit
+MAX_LENGTH = 120
+MIN_LENGTH = 30
+ERROR_PREFIX = 'Error summarizing:'    # Marks a chunk the model failed on; such summaries are never cached
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+_summarizer = None
+_summarizer_lock = threading.Lock()
+
+def get_summarizer():
     """
-    Summarizes a list of (url, title, text) tuples into a single summary string using Hugging Face transformers.
+    Returns the Hugging Face summarization pipeline on the configured backend, loading it on first use.
     """
+    global _summarizer
+    with _summarizer_lock:
+        if _summarizer is None:
+            _summarizer = model_backends.load_summarizer(MODEL_NAME)
+        return _summarizer
+
+def chunk_text(text: str, max_tokens: int = None) -> List[str]:
+    """
+    Splits text into chunks of at most max_tokens tokens, packing whole sentences where possible.
+    """
+    max_tokens = max_tokens or CHUNK_TOKENS
+    tokenizer = get_summarizer().tokenizer
+    sentences = [s for s in _SENTENCE_END.split(text.strip()) if s]
+    if not sentences:
+        return []
+    lengths = [len(ids) for ids in tokenizer(sentences, add_special_tokens=False)['input_ids']]
+    chunks, current, used = [], [], 0
+    for sentence, length in zip(sentences, lengths):
+        if length > max_tokens:
+            # A single run-on "sentence" (tables, lists) gets cut on token boundaries
+            if current:
+                chunks.append(' '.join(current))
+                current, used = [], 0
+            ids = tokenizer(sentence, add_special_tokens=False)['input_ids']
+            for start in range(0, len(ids), max_tokens):
+                chunks.append(tokenizer.decode(ids[start:start + max_tokens]))
+            continue
+        if used + length > max_tokens and current:
+            chunks.append(' '.join(current))
+            current, used = [], 0
+        current.append(sentence)
+        used += length
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+def _run_batch(texts: List[str], debug: bool = False) -> List[str]:
+    # One padded batched call; on failure retry one by one so a bad input only fails itself
+    summarizer = get_summarizer()
+    kwargs = dict(max_length=MAX_LENGTH, min_length=MIN_LENGTH, do_sample=False, truncation=True)
+    try:
+        outputs = summarizer(texts, batch_size=BATCH_SIZE, **kwargs)
+        return [o['summary_text'] for o in outputs]
+    except Exception as e:
+        if debug:
+            print(f"[DEBUG] Batched summarization failed, retrying individually: {e}")
     summaries = []
-    for url, title, text in results:
+    for text in texts:
+        try:
+            summaries.append(summarizer(text, **kwargs)[0]['summary_text'])
+        except Exception as e:
+            summaries.append(f"{ERROR_PREFIX} {e}")
+    return summaries
+
+def summarize_pages(texts: List[str], debug: bool = False, run_batch=None) -> List[str]:
+    """
+    Summarizes each text in full and returns one summary per input ('' for empty texts).
+    Long texts are chunked, all chunks are summarized in batches (map), and the chunk summaries
+    of each text are summarized again until one summary remains (reduce).
+    Texts summarized before with the same parameters are served from the summary cache.
+    With an inference server configured the whole call is delegated to it; run_batch is how
+    that server routes the model calls into its shared micro-batches.
+    """
+    if run_batch is None:
+        remote = inference.summarize(texts)
+        if remote is not None:
+            return remote
+        run_batch = lambda chunks: _run_batch(chunks, debug=debug)
+    cache = get_summary_cache()
+    params = dict(model=MODEL_NAME, backend=model_backends.MODEL_BACKEND, chunk_tokens=CHUNK_TOKENS, max_length=MAX_LENGTH, min_length=MIN_LENGTH)
+    keys = {}
+    summaries = [''] * len(texts)
+    for i, text in enumerate(texts):
         if not text.strip():
-            if debug:
-                print(f"[DEBUG] No text to summarize for {url}")
-            summaries.append(f"- [{title}]({url})\n  No readable content found.\n")
             continue
-        chunk = text[:1024]
-        try:
-            summary = summarizer(chunk, max_length=120, min_length=30, do_sample=False)[0]['summary_text']
+        keys[i] = cache_key(text, **params)
+        cached = cache.get(keys[i])
+        record_cache('summary', cached is not None)
+        if cached is not None:
             if debug:
-                print(f"[DEBUG] Summary for {url}: {summary}")
-        except Exception as e:
-            summary = f"Error summarizing: {e}"
+                print(f"[DEBUG] Summary cache hit for text {i}")
+            summaries[i] = cached
+    # Identical texts within the call are summarized once
+    owners = {}
+    for i in keys:
+        if not summaries[i]:
+            owners.setdefault(keys[i], i)
+    pending = {i: chunk_text(texts[i]) for i in owners.values()}
+    pending = {i: chunks for i, chunks in pending.items() if chunks}
+    computed = list(pending)
+    # Texts with a failed chunk in any round: their summary is partial, so it is not cached
+    failed = set()
+    while pending:
+        flat = [(i, chunk) for i, chunks in pending.items() for chunk in chunks]
+        outputs = run_batch([chunk for _, chunk in flat])
+        grouped = {}
+        for (i, _), summary in zip(flat, outputs):
+            grouped.setdefault(i, []).append(summary)
+        pending = {}
+        for i, parts in grouped.items():
+            ok = [part for part in parts if not part.startswith(ERROR_PREFIX)]
+            if len(ok) < len(parts):
+                failed.add(i)
+                # Reduce what did summarize rather than the error text; all failed leaves the error
+                parts = ok or parts[:1]
+            if len(parts) == 1:
+                summaries[i] = parts[0]
+            else:
+                pending[i] = chunk_text(' '.join(parts)) or [' '.join(parts)]
+    for i in computed:
+        if summaries[i] and i not in failed:
+            cache.put(keys[i], summaries[i])
+    for i in keys:
+        if not summaries[i]:
+            summaries[i] = summaries[owners[keys[i]]]
+    return summaries
+
+def summarize_results(results: List[Tuple[str, str, str]], debug: bool = False) -> List[Dict[str, str]]:
+    """
+    Summarizes a list of (url, title, text) tuples and returns one {'url', 'title', 'summary'} dict per result.
+    Near-duplicate pages (mirrors, syndicated copies) are not summarized again: they reuse the
+    summary of the first page with the same content and carry its URL as 'duplicate_of'.
+    """
+    texts = [text for _, _, text in results]
+    canonical = find_duplicates(texts)
+    page_summaries = summarize_pages([text if canonical[i] is None else '' for i, text in enumerate(texts)], debug=debug)
+    items = []
+    for i, (url, title, text) in enumerate(results):
+        if canonical[i] is not None:
+            item = duplicate_item(url, title, items[canonical[i]])
             if debug:
-                print(f"[DEBUG] Error summarizing {url}: {e}")
-        # Show a snippet of the summary for each URL
-        summaries.append(f"- [{title}]({url})\n  {summary.strip()}\n")
-    if not summaries:
+                print(f"[DEBUG] {url} duplicates {item['duplicate_of']}")
+            items.append(item)
+            continue
+        summary = page_summaries[i]
+        if not text.strip():
+            if debug:
+                print(f"[DEBUG] No text to summarize for {url}")
+            summary = "No readable content found."
+        elif debug:
+            print(f"[DEBUG] Summary for {url}: {summary}")
+        items.append({'url': url, 'title': title, 'summary': summary.strip()})
+    return items
+
+def duplicate_item(url: str, title: str, canonical: Dict[str, str]) -> Dict[str, str]:
+    """Result dict for a page whose content duplicates the already summarized canonical item."""
+    return {'url': url, 'title': title, 'summary': canonical['summary'], 'duplicate_of': canonical['url']}
+
+def format_summary(items: List[Dict[str, str]]) -> str:
+    """
+    Formats per-result summary dicts as the combined markdown summary shown in the CLI.
+    """
+    if not items:
         return "No summaries could be generated."
-    return '\n'.join(summaries) 
\ No newline at end of file
+    # Show a snippet of the summary for each URL
+    return '\n'.join(f"- [{item['title']}]({item['url']})\n  {_duplicate_note(item)}{item['summary']}\n" for item in items)
+
+def _duplicate_note(item: Dict[str, str]) -> str:
+    return f"(Same content as {item['duplicate_of']}) " if item.get('duplicate_of') else ''
+
+def summarize_texts(results: List[Tuple[str, str, str]], debug: bool = False) -> str:
+    """
+    Summarizes a list of (url, title, text) tuples into a single summary string using Hugging Face transformers.
+    """
+    return format_summary(summarize_results(results, debug=debug))
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+from config import DATA_DIR
+from db_pool import ConnectionPool
+
+CACHE_DB_PATH = os.path.join(DATA_DIR, 'summary_cache.db')
+MEMORY_ENTRIES = 4096       # Summaries kept in the in-process LRU tier
+POOL_SIZE = 4               # Persistent connections for the SQLite tier
+
+
+def cache_key(text: str, **params) -> str:
+    """
+    Returns a content hash of the exact text plus the model parameters that produced its summary.
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+    h.update(b'\0')
+    h.update(text.encode('utf-8'))
+    return h.hexdigest()
+
+
+class SummaryCache:
+    """
+    Two-tier summary cache: a bounded in-process LRU in front of a persistent SQLite table.
+    Entries are content-addressed, so a page summarized for one query is reused by any other.
+    """
+
+    def __init__(self, db_path: str = CACHE_DB_PATH, max_entries: int = MEMORY_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ConnectionPool(db_path, POOL_SIZE)
+        with self._pool.connection() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS summaries (
+                key TEXT PRIMARY KEY,
+                summary TEXT
+            )''')
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        with self._pool.connection() as conn:
+            row = conn.execute('SELECT summary FROM summaries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        self._remember(key, row[0])
+        return row[0]
+
+    def put(self, key: str, summary: str):
+        with self._pool.connection() as conn:
+            conn.execute('INSERT OR REPLACE INTO summaries (key, summary) VALUES (?, ?)', (key, summary))
+        self._remember(key, summary)
+
+    def _remember(self, key: str, summary: str):
+        with self._lock:
+            self._memory[key] = summary
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_summary_cache() -> SummaryCache:
+    """
+    Returns the process-wide summary cache, creating it on first use.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SummaryCache()
+        return _cache
@@ -0,0 +1,142 @@
+import threading
+from typing import List, Optional, Tuple
+import numpy as np
+
+
+def normalize(vecs: np.ndarray) -> np.ndarray:
+    """
+    Returns float32 copies of the given vectors scaled to unit length (rows for 2-D input).
+    """
+    vecs = np.asarray(vecs, dtype=np.float32)
+    norms = np.linalg.norm(vecs, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vecs / norms
+
+
+class EmbeddingIndex:
+    """
+    Resident index of stored query embeddings.
+
+    Vectors are kept pre-normalized in one contiguous float32 matrix, so scoring a query is a
+    single matrix-vector product. With approximate=True an IVF layer (k-means centroids plus
+    inverted lists) restricts the scan to the nprobe closest clusters once the index is large.
+    """
+
+    def __init__(self, dim: Optional[int] = None, approximate: bool = False,
+                 nlist: int = 256, nprobe: int = 8, min_train_size: int = 50000):
+        self.dim = dim
+        self.approximate = approximate
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self._lock = threading.RLock()
+        self._matrix = np.empty((0, dim or 0), dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._size = 0
+        self._centroids = None
+        self._lists = None
+        self._trained_size = 0
+
+    def __len__(self):
+        return self._size
+
+    def build(self, ids, vectors):
+        """Replaces the index contents with the given row ids and vectors."""
+        with self._lock:
+            vectors = normalize(vectors).reshape(len(ids), -1) if len(ids) else None
+            self._size = 0
+            self._centroids = None
+            self._lists = None
+            self._trained_size = 0
+            if vectors is None:
+                return
+            self.dim = vectors.shape[1]
+            self._matrix = np.ascontiguousarray(vectors)
+            self._ids = np.asarray(ids, dtype=np.int64)
+            self._size = len(ids)
+            self._maybe_train()
+
+    def add(self, row_id: int, vector: np.ndarray):
+        """Appends one vector, growing the backing matrix geometrically."""
+        vec = normalize(vector).ravel()
+        with self._lock:
+            if self._size == 0 and self._matrix.shape[1] != vec.shape[0]:
+                self.dim = vec.shape[0]
+                self._matrix = np.empty((0, self.dim), dtype=np.float32)
+            if vec.shape[0] != self.dim:
+                raise ValueError(f"Embedding has dimension {vec.shape[0]}, index expects {self.dim}")
+            if self._size == self._matrix.shape[0]:
+                capacity = max(16, self._matrix.shape[0] * 2)
+                matrix = np.empty((capacity, self.dim), dtype=np.float32)
+                matrix[:self._size] = self._matrix[:self._size]
+                ids = np.empty(capacity, dtype=np.int64)
+                ids[:self._size] = self._ids[:self._size]
+                self._matrix, self._ids = matrix, ids
+            self._matrix[self._size] = vec
+            self._ids[self._size] = row_id
+            if self._centroids is not None:
+                cluster = int(np.argmax(self._centroids @ vec))
+                self._lists[cluster].append(self._size)
+            self._size += 1
+            self._maybe_train()
+
+    def remove(self, row_ids):
+        """Drops the given row ids from the index."""
+        with self._lock:
+            if not self._size:
+                return
+            keep = ~np.isin(self._ids[:self._size], np.asarray(list(row_ids), dtype=np.int64))
+            self.build(self._ids[:self._size][keep], self._matrix[:self._size][keep])
+
+    def search(self, vector: np.ndarray, k: int = 1) -> List[Tuple[int, float]]:
+        """
+        Returns up to k (row_id, cosine similarity) pairs, best first.
+        """
+        query = normalize(vector).ravel()
+        with self._lock:
+            if not self._size or query.shape[0] != self.dim:
+                return []
+            if self._centroids is not None:
+                candidates = self._probe(query)
+                scores = self._matrix[candidates] @ query
+            else:
+                candidates = None
+                scores = self._matrix[:self._size] @ query
+            k = min(k, len(scores))
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            rows = candidates[top] if candidates is not None else top
+            return [(int(self._ids[r]), float(scores[t])) for r, t in zip(rows, top)]
+
+    def _probe(self, query: np.ndarray) -> np.ndarray:
+        nprobe = min(self.nprobe, len(self._centroids))
+        nearest = np.argpartition(-(self._centroids @ query), nprobe - 1)[:nprobe]
+        return np.fromiter((i for c in nearest for i in self._lists[c]), dtype=np.int64)
+
+    def _maybe_train(self):
+        # Train the IVF layer once the index is big enough, and retrain when it has doubled since
+        if not self.approximate or self._size < self.min_train_size:
+            return
+        if self._centroids is not None and self._size < 2 * self._trained_size:
+            return
+        data = self._matrix[:self._size]
+        nlist = min(self.nlist, self._size)
+        rng = np.random.default_rng(0)
+        sample = data[rng.choice(self._size, size=min(self._size, nlist * 64), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(10):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[assign == c]
+                if len(members):
+                    centroids[c] = members.sum(axis=0)
+            centroids = normalize(centroids)
+        assign = np.empty(self._size, dtype=np.int64)
+        for start in range(0, self._size, 65536):
+            block = data[start:start + 65536]
+            assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        self._centroids = centroids
+        self._lists = [list(np.flatnonzero(assign == c)) for c in range(nlist)]
+        self._trained_size = self._size
@@ -1,9 +1,11 @@
-from flask import Flask, render_template_string, request, redirect, url_for
+from flask import Flask, Response, render_template_string, request, redirect, url_for
 from query_validator import is_valid_query
 from embeddings import get_embedding
-from storage import get_similar, save_result
-from search_scraper import search_and_scrape
-from summarizer import summarize_texts
+from storage import get_similar_items
+from pipeline import answer_query
+from browser_pool import shutdown_browser_pool
+from coalescer import get_coalescer
+from metrics import record_cache, render as render_metrics, stage
 
 app = Flask(__name__)
 
@@ -48,6 +50,7 @@ TEMPLATE = '''
                 <h2 class="accordion-header" id="heading{{ loop.index }}">
                   <button class="accordion-button collapsed" type="button" data-bs-toggle="collapse" data-bs-target="#collapse{{ loop.index }}" aria-expanded="false" aria-controls="collapse{{ loop.index }}">
                     <a href="{{ s.url }}" target="_blank">{{ s.title }}</a>
+                    {% if s.duplicate_of %}<span class="badge bg-secondary ms-2" title="{{ s.duplicate_of }}">Duplicate</span>{% endif %}
                   </button>
                 </h2>
                 <div id="collapse{{ loop.index }}" class="accordion-collapse collapse" aria-labelledby="heading{{ loop.index }}" data-bs-parent="#accordion{{ loop.index }}">
@@ -90,43 +93,25 @@ def index():
     summaries = None
     if request.method == 'POST':
         query = request.form['query']
-        if not is_valid_query(query):
+        with stage('validate'):
+            valid = is_valid_query(query)
+        if not valid:
             error = "❌ This is not a valid query. Please enter a web search question."
         else:
-            embedding = get_embedding(query)
-            similar = get_similar(query, embedding)
+            with stage('embed'):
+                embedding = get_embedding(query)
+            with stage('lookup'):
+                similar = get_similar_items(embedding)
+            record_cache('query', similar is not None)
             if similar:
-                q, summary, sim = similar
+                q, summaries, sim = similar
                 info = f"Found similar past query (similarity {sim:.2f}): {q}"
-                # Parse summary into cards (assume markdown format)
-                summaries = []
-                for line in summary.split('\n- ')[1:]:
-                    if line.strip():
-                        parts = line.strip().split('\n', 1)
-                        title_url = parts[0]
-                        summ = parts[1] if len(parts) > 1 else ''
-                        if title_url.startswith('['):
-                            title = title_url.split('](')[0][1:]
-                            url = title_url.split('](')[1][:-1]
-                        else:
-                            title = url = title_url
-                        summaries.append({'title': title, 'url': url, 'summary': summ.strip()})
             else:
                 info = "Searching the web and summarizing..."
-                results = search_and_scrape(query)
-                if not results:
-                    error = "❌ No web results found. Please try a different query."
-                else:
-                    summary = summarize_texts(results)
-                    if not summary.strip():
-                        error = "❌ Summary could not be generated. The web pages may have had little or no readable content."
-                    else:
-                        # Parse summary into cards
-                        summaries = []
-                        for url, title, text in results:
-                            summ = summarize_texts([(url, title, text)])
-                            summaries.append({'title': title, 'url': url, 'summary': summ.replace(f'- [{title}]({url})', '').strip()})
-                        save_result(query, embedding, summary)
+                # Concurrent requests for the same (or a near-identical) query share one run
+                error, summaries = get_coalescer().run(query, embedding, lambda: answer_query(query, embedding))
+                if error:
+                    error = f"❌ {error}"
             # Add to recent queries
             if query not in RECENT_QUERIES:
                 RECENT_QUERIES.insert(0, query)
@@ -134,6 +119,13 @@ def index():
                 RECENT_QUERIES.pop()
     return render_template_string(TEMPLATE, query=query, error=error, info=info, summaries=summaries, recent=RECENT_QUERIES)
 
+@app.route('/metrics')
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     # Do NOT use debug=True with Playwright; it causes browser process errors on reload.
-    app.run(debug=False, threaded=True) 
\ No newline at end of file
+    try:
+        app.run(debug=False, threaded=True)
+    finally:
+        shutdown_browser_pool() 
@@ -1,9 +1,13 @@
 from flask import Flask, render_template_string, request, Response, stream_with_context
 from query_validator import is_valid_query
 from embeddings import get_embedding
-from storage import get_similar, save_result
-from search_scraper import search_and_scrape
-from summarizer import summarize_texts
+from storage import get_similar_items, save_result
+from search_scraper import iter_search_and_scrape
+from summarizer import duplicate_item, summarize_results, format_summary
+from dedup import DuplicateDetector
+from browser_pool import shutdown_browser_pool
+from coalescer import get_coalescer
+from metrics import record_cache, render as render_metrics, stage
 import json
 
 app = Flask(__name__)
@@ -55,14 +59,18 @@ TEMPLATE = '''
             progress.innerHTML = '';
             const card = document.createElement('div');
             card.className = 'card summary-card';
+            card.dataset.rank = data.rank;
             card.innerHTML = `
               <div class="card-header">
                 <a href="${data.url}" target="_blank">${data.title}</a>
+                ${data.duplicate_of ? `<span class="badge bg-secondary ms-2" title="${data.duplicate_of}">Duplicate</span>` : ''}
                 <button class="btn btn-outline-secondary btn-sm float-end" onclick="navigator.clipboard.writeText(\`${data.summary.replace(/`/g, '\`')}\`)">Copy</button>
               </div>
               <div class="card-body"><pre style="white-space: pre-wrap;">${data.summary}</pre></div>
             `;
-            summaries.appendChild(card);
+            // Cards arrive in completion order; insert each one at its search rank
+            const next = Array.from(summaries.children).find(c => Number(c.dataset.rank) > data.rank);
+            summaries.insertBefore(card, next || null);
           } else if (data.type === 'error') {
             progress.innerHTML = '';
             errorDiv.textContent = data.message;
@@ -90,48 +98,78 @@ TEMPLATE = '''
 def index():
     return render_template_string(TEMPLATE)
 
+def answer_query(query, embedding):
+    """
+    Searches, summarizes and saves a query that missed the cache, yielding SSE events.
+    """
+    yield f'data: {json.dumps({"type": "progress", "message": "Searching the web..."})}\n\n'
+    # Pages are summarized as soon as each fetch completes; cards carry their search rank
+    # so the client can keep them in result order
+    items = {}
+    # Pages with the same content as one already shown reuse its summary instead of a model call
+    detector = DuplicateDetector()
+    arrived = []
+    for rank, result in iter_search_and_scrape(query):
+        canonical = detector.add(result[2])
+        if canonical is not None:
+            item = duplicate_item(result[0], result[1], items[arrived[canonical]])
+        else:
+            yield f'data: {json.dumps({"type": "progress", "message": f"Summarizing result {len(items)+1}: {result[1]}"})}\n\n'
+            with stage('summarize'):
+                item = summarize_results([result])[0]
+        arrived.append(rank)
+        items[rank] = item
+        yield f'data: {json.dumps({"type": "summary", "rank": rank, **item})}\n\n'
+    if not items:
+        yield f'data: {json.dumps({"type": "error", "message": "❌ No web results found. Please try a different query."})}\n\n'
+        return
+    # Save the per-result summaries for future similarity
+    items = [items[rank] for rank in sorted(items)]
+    with stage('save'):
+        save_result(query, embedding, format_summary(items), items)
+    yield f'data: {json.dumps({"type": "done"})}\n\n'
+
 @app.route('/stream')
 def stream():
     query = request.args.get('query', '')
     def event_stream():
-        if not is_valid_query(query):
+        with stage('validate'):
+            valid = is_valid_query(query)
+        if not valid:
             yield f'data: {json.dumps({"type": "error", "message": "❌ This is not a valid query. Please enter a web search question."})}\n\n'
             return
         yield f'data: {json.dumps({"type": "progress", "message": "Checking for similar queries..."})}\n\n'
-        embedding = get_embedding(query)
-        similar = get_similar(query, embedding)
+        with stage('embed'):
+            embedding = get_embedding(query)
+        with stage('lookup'):
+            similar = get_similar_items(embedding)
+        record_cache('query', similar is not None)
         if similar:
-            q, summary, sim = similar
+            q, items, sim = similar
             yield f'data: {json.dumps({"type": "progress", "message": f"Found similar past query (similarity {sim:.2f}): {q}"})}\n\n'
-            # Parse summary into cards
-            for line in summary.split('\n- ')[1:]:
-                if line.strip():
-                    parts = line.strip().split('\n', 1)
-                    title_url = parts[0]
-                    summ = parts[1] if len(parts) > 1 else ''
-                    if title_url.startswith('['):
-                        title = title_url.split('](')[0][1:]
-                        url = title_url.split('](')[1][:-1]
-                    else:
-                        title = url = title_url
-                    yield f'data: {json.dumps({"type": "summary", "title": title, "url": url, "summary": summ.strip()})}\n\n'
+            for rank, item in enumerate(items):
+                yield f'data: {json.dumps({"type": "summary", "rank": rank, **item})}\n\n'
             yield f'data: {json.dumps({"type": "done"})}\n\n'
             return
-        yield f'data: {json.dumps({"type": "progress", "message": "Searching the web..."})}\n\n'
-        results = search_and_scrape(query)
-        if not results:
-            yield f'data: {json.dumps({"type": "error", "message": "❌ No web results found. Please try a different query."})}\n\n'
-            return
-        for idx, (url, title, text) in enumerate(results):
-            yield f'data: {json.dumps({"type": "progress", "message": f"Summarizing result {idx+1} of {len(results)}..."})}\n\n'
-            summ = summarize_texts([(url, title, text)])
-            summary = summ.replace(f'- [{title}]({url})', '').strip()
-            yield f'data: {json.dumps({"type": "summary", "title": title, "url": url, "summary": summary})}\n\n'
-        # Save the full summary for future similarity
-        full_summary = summarize_texts(results)
-        save_result(query, embedding, full_summary)
-        yield f'data: {json.dumps({"type": "done"})}\n\n'
+        # Concurrent requests for the same (or a near-identical) query share one run; late
+        # joiners get the events emitted so far replayed, then follow the live ones
+        flight, leader = get_coalescer().join(query, embedding)
+        if leader:
+            get_coalescer().start(flight, lambda: answer_query(query, embedding))
+        else:
+            yield f'data: {json.dumps({"type": "progress", "message": f"Joining a search already in progress: {flight.query}"})}\n\n'
+        try:
+            yield from flight.subscribe()
+        except Exception as e:
+            yield f'data: {json.dumps({"type": "error", "message": f"❌ Error while answering query: {e}"})}\n\n'
     return Response(stream_with_context(event_stream()), mimetype='text/event-stream')
 
+@app.route('/metrics')
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
-    app.run(debug=False, threaded=True) 
\ No newline at end of file
+    try:
+        app.run(debug=False, threaded=True)
+    finally:
+        shutdown_browser_pool()
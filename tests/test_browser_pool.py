@@ -0,0 +1,68 @@
+"""
+BrowserPool worker lifecycle, with Playwright replaced by fakes so no browser is needed.
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ripplica_agent'))
+import browser_pool  # noqa: E402
+
+
+class _Fake:
+    # Stands in for Playwright, its browser, context and page alike
+    def __init__(self):
+        self.firefox = self
+
+    def start(self):
+        return self
+
+    def launch(self, headless=True):
+        return self
+
+    def is_connected(self):
+        return True
+
+    def new_context(self):
+        return self
+
+    def new_page(self):
+        return self
+
+    def close(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+def _missing_driver():
+    raise RuntimeError('driver not installed')
+
+
+@pytest.fixture
+def pool():
+    pool = browser_pool.BrowserPool(max_browsers=2)
+    yield pool
+    pool.close(timeout=1)
+
+
+def test_runs_jobs(monkeypatch, pool):
+    monkeypatch.setattr(browser_pool, 'sync_playwright', _Fake)
+    assert [pool.run(lambda page: i, timeout=5) for i in range(3)] == [0, 1, 2]
+
+
+def test_startup_failure_fails_fast_and_recovers(monkeypatch, pool):
+    monkeypatch.setattr(browser_pool, 'sync_playwright', _missing_driver)
+    start = time.monotonic()
+    for _ in range(4):
+        with pytest.raises(RuntimeError, match='driver not installed'):
+            pool.run(lambda page: 'unreachable', timeout=5)
+    assert time.monotonic() - start < 2
+    assert not pool._workers and pool._jobs.empty()
+
+    # Once Playwright works again, the next job starts a fresh worker
+    monkeypatch.setattr(browser_pool, 'sync_playwright', _Fake)
+    assert pool.run(lambda page: 'ok', timeout=5) == 'ok'
@@ -0,0 +1,43 @@
+"""
+Near-duplicate detection over a result list, on pages built from random words so only the
+deliberately shared text overlaps.
+"""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ripplica_agent'))
+import dedup  # noqa: E402
+
+_rng = random.Random(0)
+_WORDS = [f'word{i}' for i in range(5000)]
+
+
+def _text(n):
+    return ' '.join(_rng.choice(_WORDS) for _ in range(n))
+
+
+def _results(copies, total=5):
+    # Every page carries the same site chrome; the first `copies` pages syndicate one article
+    chrome, article = _text(30), _text(300)
+    pages = [f'{chrome} {article} {_text(10)}' for _ in range(copies)]
+    return pages + [f'{chrome} {_text(300)}' for _ in range(total - copies)]
+
+
+def _detect_streaming(pages):
+    detector = dedup.DuplicateDetector()
+    return [detector.add(page) for page in pages]
+
+
+@pytest.mark.parametrize('detect', [dedup.find_duplicates, _detect_streaming])
+@pytest.mark.parametrize('copies', [2, 3, 4])
+def test_syndicated_copies(detect, copies):
+    assert detect(_results(copies)) == [None] + [0] * (copies - 1) + [None] * (5 - copies)
+
+
+@pytest.mark.parametrize('detect', [dedup.find_duplicates, _detect_streaming])
+def test_shared_chrome_is_not_duplication(detect):
+    chrome = _text(120)
+    assert detect([f'{chrome} {_text(100)}' for _ in range(5)]) == [None] * 5
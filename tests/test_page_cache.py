@@ -0,0 +1,61 @@
+"""
+PageCache storage, LRU eviction and batched access tracking on a temporary database.
+"""
+import os
+import random
+import sqlite3
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ripplica_agent'))
+import page_cache  # noqa: E402
+
+_rng = random.Random(0)
+
+
+def _text(n=4000):
+    # Random letters barely compress, so every page takes about n bytes
+    return ''.join(_rng.choice(string.ascii_letters) for _ in range(n))
+
+
+def _urls(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {url for url, in conn.execute('SELECT url FROM pages')}
+    finally:
+        conn.close()
+
+
+def test_lookup_and_revalidation(tmp_path):
+    cache = page_cache.PageCache(str(tmp_path / 'pages.db'), ttl=60)
+    assert cache.lookup('https://example.com/a') is None
+    cache.store('https://Example.com/a?utm_source=x#top', 'A', 'text a', etag='"1"')
+    entry = cache.lookup('https://example.com/a')
+    assert entry == {'title': 'A', 'text': 'text a', 'etag': '"1"', 'last_modified': None, 'fresh': True}
+    assert cache.conditional_headers(entry) == {'If-None-Match': '"1"'}
+
+
+def test_evicts_least_recently_used(tmp_path):
+    path = str(tmp_path / 'pages.db')
+    cache = page_cache.PageCache(path, max_bytes=7000)
+    cache.store('https://example.com/a', 'A', _text())
+    time.sleep(0.01)
+    cache.store('https://example.com/b', 'B', _text())
+    time.sleep(0.01)
+    # The hit on a is only recorded in memory, but must still count when c forces an eviction
+    assert cache.lookup('https://example.com/a') is not None
+    time.sleep(0.01)
+    cache.store('https://example.com/c', 'C', _text())
+    assert _urls(path) == {'https://example.com/a', 'https://example.com/c'}
+    assert cache.stats()['evicted'] == 1
+
+
+def test_replacing_a_page_keeps_the_size_total(tmp_path):
+    path = str(tmp_path / 'pages.db')
+    cache = page_cache.PageCache(path, max_bytes=7000)
+    for _ in range(5):
+        cache.store('https://example.com/a', 'A', _text())
+    cache.store('https://example.com/b', 'B', _text())
+    assert _urls(path) == {'https://example.com/a', 'https://example.com/b'}
+    assert cache.stats()['evicted'] == 0
@@ -0,0 +1,87 @@
+"""
+Body download limits of search_scraper.read_capped, against a local HTTP server.
+"""
+import gzip
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ripplica_agent'))
+import search_scraper  # noqa: E402
+
+PAGE = b'<html><body>' + b'<p>Some article text.</p>' * 2000 + b'</body></html>'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = gzip.compress(PAGE) if self.path == '/gzip' else PAGE
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        if self.path == '/gzip':
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        if self.path == '/trickle':
+            # A few bytes at a time, each well within the socket timeout
+            for start in range(0, len(body), 16):
+                self.wfile.write(body[start:start + 16])
+                self.wfile.flush()
+                time.sleep(0.05)
+        else:
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+
+
+class _WithoutRead1:
+    # urllib3 before 2.2 has no HTTPResponse.read1
+    def __init__(self, raw):
+        self._raw = raw
+
+    def __getattr__(self, name):
+        if name == 'read1':
+            raise AttributeError(name)
+        return getattr(self._raw, name)
+
+
+def _get(url, read1=True):
+    resp = requests.get(url, stream=True, timeout=5)
+    if not read1:
+        resp.raw = _WithoutRead1(resp.raw)
+    return resp
+
+
+@pytest.mark.parametrize('read1', [True, False])
+@pytest.mark.parametrize('path', ['/plain', '/gzip'])
+def test_reads_whole_body(server, path, read1):
+    with _get(server + path, read1) as resp:
+        assert search_scraper.read_capped(resp, deadline=time.monotonic() + 5) == PAGE
+
+
+@pytest.mark.parametrize('read1', [True, False])
+def test_caps_body_size(server, read1):
+    with _get(server + '/plain', read1) as resp:
+        assert search_scraper.read_capped(resp, max_bytes=1000) == PAGE[:1000]
+
+
+def test_trickling_server_hits_deadline(server):
+    start = time.monotonic()
+    with _get(server + '/trickle') as resp:
+        with pytest.raises(TimeoutError):
+            search_scraper.read_capped(resp, deadline=time.monotonic() + 0.5)
+    assert time.monotonic() - start < 2
@@ -0,0 +1,129 @@
+"""
+Schema migration and cross-process tests for results.db. storage reads RIPPLICA_DATA_DIR and migrates at import
+time, so every check imports it in a fresh interpreter pointed at a temporary data directory.
+"""
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+
+import numpy as np
+
+AGENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ripplica_agent')
+
+REPORT = '''
+import json, sys
+sys.path.insert(0, {agent_dir!r})
+import numpy as np
+import storage
+with storage.get_pool().connection() as conn:
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    columns = {{t: [r[1] for r in conn.execute(f'PRAGMA table_info({{t}})')] for t in ('results', 'result_items')}}
+    created = [r[0] for r in conn.execute('SELECT created_at FROM results')]
+vec = np.zeros(8, dtype=np.float32)
+vec[0] = 1
+print(json.dumps({{'version': version, 'columns': columns, 'created': created,
+                  'similar': storage.get_similar_items(vec)}}))
+'''
+
+READER = '''
+import json, subprocess, sys
+sys.path.insert(0, {agent_dir!r})
+import numpy as np
+import storage
+vec = np.zeros(8, dtype=np.float32)
+vec[5] = 1
+before = storage.get_similar_items(vec)
+# Another process answers the query after this one loaded its index
+subprocess.run([sys.executable, '-c', {writer!r}], check=True)
+print(json.dumps({{'before': before, 'after': storage.get_similar_items(vec)}}))
+'''
+
+WRITER = '''
+import sys
+sys.path.insert(0, {agent_dir!r})
+import numpy as np
+import storage
+vec = np.zeros(8, dtype=np.float32)
+vec[5] = 1
+storage.save_result('query 5', vec, '', [{{'url': 'https://example.com/5', 'title': 'Title 5', 'summary': 'summary 5'}}])
+'''
+
+
+def _vector(i):
+    vec = np.zeros(8, dtype=np.float32)
+    vec[i] = 1
+    return vec.tobytes()
+
+
+def _make_legacy_db(path, version):
+    # version 0: the original single-table schema; version 1: with result_items, before timestamps
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE results (id INTEGER PRIMARY KEY AUTOINCREMENT, query TEXT, embedding BLOB, summary TEXT)')
+    if version >= 1:
+        conn.execute('''CREATE TABLE result_items (id INTEGER PRIMARY KEY AUTOINCREMENT, result_id INTEGER,
+                        rank INTEGER, url TEXT, title TEXT, summary TEXT)''')
+    for i in range(3):
+        cur = conn.execute('INSERT INTO results (query, embedding, summary) VALUES (?, ?, ?)',
+                           (f'query {i}', _vector(i), f'- [Title {i}](https://example.com/{i})\n  summary {i}\n'))
+        if version >= 1:
+            conn.execute('INSERT INTO result_items (result_id, rank, url, title, summary) VALUES (?, 0, ?, ?, ?)',
+                         (cur.lastrowid, f'https://example.com/{i}', f'Title {i}', f'summary {i}'))
+    conn.execute(f'PRAGMA user_version = {version}')
+    conn.commit()
+    conn.close()
+
+
+def _start(data_dir, script):
+    env = dict(os.environ, RIPPLICA_DATA_DIR=str(data_dir))
+    return subprocess.Popen([sys.executable, '-c', script], env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+
+def _report(proc):
+    out, err = proc.communicate(timeout=60)
+    assert proc.returncode == 0, err
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def _check_migrated(report):
+    assert report['version'] == 3
+    assert {'created_at', 'last_hit_at'} <= set(report['columns']['results'])
+    assert 'duplicate_of' in report['columns']['result_items']
+    assert len(report['created']) == 3 and all(report['created'])
+    query, items, sim = report['similar']
+    assert query == 'query 0' and sim > 0.99
+    assert items == [{'url': 'https://example.com/0', 'title': 'Title 0', 'summary': 'summary 0'}]
+
+
+def test_migrates_v1_db(tmp_path):
+    _make_legacy_db(tmp_path / 'results.db', version=1)
+    _check_migrated(_report(_start(tmp_path, REPORT.format(agent_dir=AGENT_DIR))))
+
+
+def test_migrates_original_schema(tmp_path):
+    _make_legacy_db(tmp_path / 'results.db', version=0)
+    _check_migrated(_report(_start(tmp_path, REPORT.format(agent_dir=AGENT_DIR))))
+
+
+def test_concurrent_processes_migrate_once(tmp_path):
+    _make_legacy_db(tmp_path / 'results.db', version=1)
+    procs = [_start(tmp_path, REPORT.format(agent_dir=AGENT_DIR)) for _ in range(6)]
+    for proc in procs:
+        _check_migrated(_report(proc))
+
+
+def test_new_db(tmp_path):
+    report = _report(_start(tmp_path, REPORT.format(agent_dir=AGENT_DIR)))
+    assert report['version'] == 3 and report['similar'] is None
+
+
+def test_sees_rows_saved_by_other_processes(tmp_path):
+    _make_legacy_db(tmp_path / 'results.db', version=1)
+    writer = WRITER.format(agent_dir=AGENT_DIR)
+    report = _report(_start(tmp_path, READER.format(agent_dir=AGENT_DIR, writer=writer)))
+    assert report['before'] is None
+    query, items, sim = report['after']
+    assert query == 'query 5' and sim > 0.99
+    assert items == [{'url': 'https://example.com/5', 'title': 'Title 5', 'summary': 'summary 5'}]
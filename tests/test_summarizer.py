@@ -0,0 +1,56 @@
+"""
+summarize_pages map/reduce and caching, with the model and tokenizer replaced by stubs: a text
+chunks on '|', and a "summary" is the chunk upper-cased unless it contains 'boom'.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ripplica_agent'))
+import summarizer  # noqa: E402
+
+
+class _DictCache:
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, key, summary):
+        self.entries[key] = summary
+
+
+def _run_batch(chunks):
+    return [f"{summarizer.ERROR_PREFIX} boom" if 'boom' in chunk else chunk.upper() for chunk in chunks]
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = _DictCache()
+    monkeypatch.setattr(summarizer, 'get_summary_cache', lambda: cache)
+    monkeypatch.setattr(summarizer, 'chunk_text', lambda text: [c for c in text.split('|') if c])
+    return cache
+
+
+def test_caches_multi_chunk_summaries(cache):
+    assert summarizer.summarize_pages(['one|two', 'three'], run_batch=_run_batch) == ['ONE TWO', 'THREE']
+    assert sorted(cache.entries.values()) == ['ONE TWO', 'THREE']
+
+
+def test_failed_chunk_is_not_cached(cache):
+    summaries = summarizer.summarize_pages(['one|boom|two', 'three'], run_batch=_run_batch)
+    # The page still gets a summary of the chunks that worked, but only the clean page is cached
+    assert summaries == ['ONE TWO', 'THREE']
+    assert list(cache.entries.values()) == ['THREE']
+    # So the next call summarizes it again instead of serving the partial summary
+    calls = []
+    summarizer.summarize_pages(['one|boom|two'], run_batch=lambda chunks: calls.append(chunks) or _run_batch(chunks))
+    assert calls
+
+
+def test_failed_page_keeps_the_error(cache):
+    summaries = summarizer.summarize_pages(['boom'], run_batch=_run_batch)
+    assert summaries[0].startswith(summarizer.ERROR_PREFIX)
+    assert not cache.entries